@@ -1,65 +1,150 @@
-def apply_minmax(depth,max_min,root):
-        if len(root.children) ==0 | depth==0:
-            return root.evaluation
+from .transposition import EXACT, bound_type
+from .state_tree_node import UNEXPANDED, EVALUATED
+
+
+def _ordered_children(nodes, root, best_move):
+    children = list(nodes.children(root))
+    # try the best move of the previous search of this position first
+    if best_move is not None:
+        for index, child in enumerate(children):
+            if nodes.move[child] == best_move:
+                if index:
+                    children.insert(0, children.pop(index))
+                break
+    return children
+
+
+def _best_child_move(nodes, root):
+    for child in nodes.children(root):
+        if nodes.evaluation[child] == nodes.evaluation[root]:
+            return nodes.move[child]
+    return None
+
+
+def apply_minmax(depth,max_min,nodes,root,table=None,ply=0):
+        evaluation = nodes.evaluation
+        nodes.visits[root] += 1
+        if not nodes.has_children(root) or depth == 0:
+            return evaluation[root]
+
+        best_move = None
+        if table is not None:
+            score, best_move = table.probe(nodes.key[root], depth, float('-inf'), float('inf'))
+            # the root always has to evaluate its children to pick one of them
+            if score is not None and ply > 0:
+                evaluation[root] = score
+                return score
 
         if max_min:
-            root.evaluation= float('-inf')
-            for child in root.children:
-                root.evaluation = max(root.evaluation,apply_minmax(depth-1,False,child))
-            return root.evaluation
+            evaluation[root]= float('-inf')
+            for child in _ordered_children(nodes, root, best_move):
+                evaluation[root] = max(evaluation[root],apply_minmax(depth-1,False,nodes,child,table,ply+1))
         else:
-            root.evaluation= float('inf')
-            for child in root.children:
-                root.evaluation = min(root.evaluation,apply_minmax(depth-1,True,child))
-            return root.evaluation
+            evaluation[root]= float('inf')
+            for child in _ordered_children(nodes, root, best_move):
+                evaluation[root] = min(evaluation[root],apply_minmax(depth-1,True,nodes,child,table,ply+1))
 
+        if table is not None:
+            table.store(nodes.key[root], depth, evaluation[root], EXACT, _best_child_move(nodes, root))
+        return evaluation[root]
 
-def apply_alphabeta(depth, max_min, root, alpha=float('-inf'), beta=float('inf')):
 
-    if len(root.children) == 0 or depth == 0:
-        return root.evaluation
+def apply_alphabeta(depth, max_min, nodes, root, alpha=float('-inf'), beta=float('inf'), table=None, ply=0):
+    evaluation = nodes.evaluation
+    nodes.visits[root] += 1
+    if not nodes.has_children(root) or depth == 0:
+        return evaluation[root]
+
+    best_move = None
+    if table is not None:
+        score, best_move = table.probe(nodes.key[root], depth, alpha, beta)
+        # the root always has to evaluate its children to pick one of them
+        if score is not None and ply > 0:
+            evaluation[root] = score
+            return score
+    alpha_original, beta_original = alpha, beta
 
     if max_min:
-        root.evaluation = float('-inf')
-        for child in root.children:
-            eval_value = apply_alphabeta(depth - 1, False, child, alpha, beta)
+        evaluation[root] = float('-inf')
+        for child in _ordered_children(nodes, root, best_move):
+            eval_value = apply_alphabeta(depth - 1, False, nodes, child, alpha, beta, table, ply + 1)
 
-            root.evaluation = max(root.evaluation, eval_value)
-            alpha = max(alpha, root.evaluation)
+            evaluation[root] = max(evaluation[root], eval_value)
+            alpha = max(alpha, evaluation[root])
 
             if beta <= alpha: # cut-off
                 break
 
-        return root.evaluation
-
     else:
-        root.evaluation = float('inf')
-        for child in root.children:
-            eval_value = apply_alphabeta(depth - 1, True, child, alpha, beta)
+        evaluation[root] = float('inf')
+        for child in _ordered_children(nodes, root, best_move):
+            eval_value = apply_alphabeta(depth - 1, True, nodes, child, alpha, beta, table, ply + 1)
 
-            root.evaluation = min(root.evaluation, eval_value)
-            beta = min(beta, root.evaluation)
+            evaluation[root] = min(evaluation[root], eval_value)
+            beta = min(beta, evaluation[root])
 
             if beta <= alpha:
                 break
 
-        return root.evaluation
-
-import time
-def iterative_depening(max_time, max_min, tree):
-    # assuming start with depth 1
-    # Ex: a
-    #     |->b
-    #     |->c
-    #     |->d
-    start_time = time.time()
-    result = None
-    depth= 1
-    while(True):
-        result = apply_alphabeta(tree._depth, max_min, tree._root)
-        if (time.time() - start_time) >= max_time:
+    if table is not None:
+        table.store(nodes.key[root], depth, evaluation[root], bound_type(evaluation[root], alpha_original, beta_original), _best_child_move(nodes, root))
+    return evaluation[root]
+
+
+def apply_lazy_alphabeta(depth, max_min, tree, root, alpha=float('-inf'), beta=float('inf'), ply=0):
+    """
+    apply_alphabeta over a StateTree that grows during the search. The board
+    follows the search and tree.iter_children only generates a child when the
+    loop reaches it, so nothing past a cutoff is generated or allocated.
+    """
+    nodes = tree.nodes
+    evaluation = nodes.evaluation
+    table = tree.table
+    nodes.visits[root] += 1
+    if depth == 0:
+        if nodes.expansion[root] == UNEXPANDED:
+            evaluation[root] = tree.evaluate_board()
+            nodes.expansion[root] = EVALUATED
+        return evaluation[root]
+
+    best_move = None
+    if table is not None:
+        score, best_move = table.probe(nodes.key[root], depth, alpha, beta)
+        # the root always has to evaluate its children to pick one of them
+        if score is not None and ply > 0:
+            evaluation[root] = score
+            return score
+    alpha_original, beta_original = alpha, beta
+
+    value = float('-inf') if max_min else float('inf')
+    searched = False
+    children = tree.iter_children(root, best_move)
+    for child in children:
+        searched = True
+        tree.visited_children += 1
+        tree.play_move(nodes.move[child])
+        nodes.key[child] = tree._board_state.position_key()
+        try:
+            eval_value = apply_lazy_alphabeta(depth - 1, not max_min, tree, child, alpha, beta, ply + 1)
+        finally:
+            tree.reverse_move(nodes.move[child])
+
+        if max_min:
+            value = max(value, eval_value)
+            alpha = max(alpha, value)
+        else:
+            value = min(value, eval_value)
+            beta = min(beta, value)
+        if beta <= alpha: # cut-off, the rest of the moves are never generated
             break
-        depth = depth + 1
-        tree.add_level(tree._root, 1)
-        tree._depth = depth
-    return result
+    children.close()
+
+    if not searched:
+        # nothing to play, the game is over or the side to move is stuck
+        evaluation[root] = tree.evaluate_board()
+        return evaluation[root]
+
+    evaluation[root] = value
+    if table is not None:
+        table.store(nodes.key[root], depth, value, bound_type(value, alpha_original, beta_original), _best_child_move(nodes, root))
+    return value
@@ -0,0 +1,248 @@
+from operator import mul
+
+from utils.cell import DISTANCE_BUCKETS, NEIGHBOR_OFFSETS, distance_bucket, unpack
+from utils.pieces import Ant, Beetle, Grasshopper, Queen, Spider
+
+PIECE_VALUES = {Queen: 10, Ant: 8, Beetle: 5, Grasshopper: 3, Spider: 2}
+# points for a piece (or a cell it can move to) by how close it is to the enemy queen
+PLACE_VALUES = (20, 12, 5, 2, 1, 0)
+# points for every piece around the enemy queen, minus those around our own
+QUEEN_SURROUND_WEIGHT = 1000
+# queens and beetles this many steps around a changed cell get their moves
+# counted again, their moves only depend on the cells up to there
+MOBILITY_RADIUS = 2
+# the same for spiders, three slides and the gates beside them
+SPIDER_MOBILITY_RADIUS = 3
+
+_NEIGHBOR_SET = frozenset(NEIGHBOR_OFFSETS)
+
+
+def _radius_offsets(radius):
+    offsets = {0}
+    for _ in range(radius):
+        offsets |= {offset + step for offset in offsets for step in NEIGHBOR_OFFSETS}
+    return tuple(offsets)
+
+
+# piece type -> offsets from the piece of the cells its moves depend on
+_REACH = {
+    Queen: frozenset(_radius_offsets(MOBILITY_RADIUS)),
+    Beetle: frozenset(_radius_offsets(MOBILITY_RADIUS)),
+    Spider: frozenset(_radius_offsets(SPIDER_MOBILITY_RADIUS)),
+}
+
+
+def _on_line(cell, other):
+    """Whether other is on one of the six straight lines through cell."""
+    x, y = unpack(cell)
+    other_x, other_y = unpack(other)
+    return y == other_y or abs(x - other_x) == abs(y - other_y)
+
+
+def distance_score(cell, queen_cell):
+    """PLACE_VALUES entry of a cell by its distance to the queen's cell."""
+    return PLACE_VALUES[distance_bucket(cell, queen_cell)]
+
+
+class IncrementalEvaluator:
+    """
+    The terms of StateTree.evaluate_board kept up to date by the board
+    itself (see Board.add_listener), so scoring a leaf doesn't scan the
+    whole board:
+
+    - queen_neighbors: occupied cells around every queen, changed by one
+      when a cell next to a queen gets filled or emptied.
+    - distance: per team, value of every top piece times how close it is
+      to the enemy queen. Only the piece that moved is rescored, a whole
+      team only when the enemy queen moves.
+    - mobility (Medium/Hard): the same for every cell a top piece can move
+      to, from the distance histogram of GameObject.count_next_possible_cells.
+      A piece keeps its last count unless a cell its moves depend on
+      changed (within MOBILITY_RADIUS of a queen or beetle, within
+      SPIDER_MOBILITY_RADIUS of a spider, on a grasshopper's lines), it got
+      pinned or freed by the one-hive rule (its cell joined or left
+      Board.articulation_points) or the enemy queen moved. An ant can reach
+      the whole perimeter, so ants are counted again after every change.
+      The term is exact whatever the path to the position.
+    - hand_material: value of the pieces still in every hand.
+    """
+
+    def __init__(self, board, mobility=False):
+        self.board = board
+        self.mobility = mobility
+        self.refresh()
+        board.add_listener(self)
+
+    @classmethod
+    def attach(cls, board, mobility=False):
+        """
+        The board's evaluator with the mobility setting, created the first
+        time. It is refreshed, so its estimates start out exact.
+        """
+        for listener in board._listeners:
+            if isinstance(listener, cls) and listener.mobility == mobility:
+                listener.refresh()
+                return listener
+        return cls(board, mobility)
+
+    def config(self):
+        """Settings the score depends on, see EvaluationCache."""
+        return (self.mobility, MOBILITY_RADIUS)
+
+    def refresh(self):
+        """Computes every term from scratch."""
+        self._queen_cells = [None, None]
+        self.queen_neighbors = [0, 0]
+        self.distance = [0, 0]
+        self._distance_of = [{}, {}]
+        self.mobility_score = [0, 0]
+        self._mobility_of = [{}, {}]
+        # Board.articulation_points() when the moves were last counted
+        self._articulation_points = self.board.articulation_points()
+        # pieces whose moves have to be counted again, and the cells
+        # changed since the last score (their neighbours are added then)
+        self._dirty = set()
+        self._changed_cells = set()
+
+        self._sync_queens()
+        for cell, piece in self.board._cells.items():
+            self._add(piece, cell)
+
+    def top_changed(self, cell, old_top, new_top):
+        if (old_top is None) != (new_top is None):
+            change = 1 if new_top is not None else -1
+            for team, queen_cell in enumerate(self._queen_cells):
+                if queen_cell is not None and cell - queen_cell in _NEIGHBOR_SET:
+                    self.queen_neighbors[team] += change
+
+        if old_top is not None:
+            self._remove(old_top)
+        if new_top is not None:
+            self._add(new_top, cell)
+        if self.mobility:
+            self._changed_cells.add(cell)
+        if old_top.__class__ is Queen or new_top.__class__ is Queen:
+            self._sync_queens()
+
+    def _sync_queens(self):
+        # a queen taken back is only dropped from the board's references
+        # after it is lifted, so the cells are compared again before scoring
+        board = self.board
+        for team, queen in enumerate(board._queens_reference):
+            cell = queen.get_cell() if queen else None
+            previous = self._queen_cells[team]
+            if cell == previous:
+                continue
+            self._queen_cells[team] = cell
+            self.queen_neighbors[team] = board.queen_neighbors(team)
+            self._rescore_team(1 - team)
+            if self.mobility and (cell is None) != (previous is None):
+                # pieces can't move while their own queen is in the hand
+                self._dirty.update(piece for piece in board._cells.values() if piece.get_team() == team)
+
+    def _add(self, piece, cell):
+        team = piece.get_team()
+        enemy_queen = self._queen_cells[1 - team]
+        score = PIECE_VALUES[piece.__class__] * distance_score(cell, enemy_queen) if enemy_queen is not None else 0
+        self._distance_of[team][piece] = score
+        self.distance[team] += score
+        if self.mobility:
+            self._dirty.add(piece)
+
+    def _remove(self, piece):
+        team = piece.get_team()
+        self.distance[team] -= self._distance_of[team].pop(piece)
+        if self.mobility:
+            self.mobility_score[team] -= self._mobility_of[team].pop(piece, 0)
+            self._dirty.discard(piece)
+
+    def _mobility(self, piece):
+        enemy_queen = self._queen_cells[1 - piece.get_team()]
+        if enemy_queen is None:
+            return 0
+        histogram = [0] * DISTANCE_BUCKETS
+        piece.count_next_possible_cells(self.board, enemy_queen, histogram)
+        return PIECE_VALUES[piece.__class__] * sum(map(mul, histogram, PLACE_VALUES))
+
+    def _rescore_team(self, team):
+        enemy_queen = self._queen_cells[1 - team]
+        distance_of = self._distance_of[team]
+        for piece in distance_of:
+            distance_of[piece] = (
+                PIECE_VALUES[piece.__class__] * distance_score(piece.get_cell(), enemy_queen) if enemy_queen is not None else 0
+            )
+        self.distance[team] = sum(distance_of.values())
+
+        if self.mobility:
+            # the histograms are relative to the old queen cell
+            self._dirty.update(self._mobility_of[team])
+
+    def _update_mobility(self):
+        board = self.board
+        cells = board._cells
+        dirty = self._dirty
+        changed_cells = self._changed_cells
+        if changed_cells:
+            for cell, piece in cells.items():
+                if piece in dirty:
+                    continue
+                kind = piece.__class__
+                if kind is Ant:
+                    dirty.add(piece)
+                elif kind is Grasshopper:
+                    if any(_on_line(cell, changed) for changed in changed_cells):
+                        dirty.add(piece)
+                elif any(cell - changed in _REACH[kind] for changed in changed_cells):
+                    dirty.add(piece)
+            changed_cells.clear()
+
+            # pinned or freed pieces, the others kept their cell and height
+            points = board.articulation_points()
+            if points is not self._articulation_points:
+                for cell in points ^ self._articulation_points:
+                    piece = cells.get(cell)
+                    if piece is not None:
+                        dirty.add(piece)
+                self._articulation_points = points
+
+        for piece in dirty:
+            team = piece.get_team()
+            score = self._mobility(piece)
+            self.mobility_score[team] += score - self._mobility_of[team].get(piece, 0)
+            self._mobility_of[team][piece] = score
+        dirty.clear()
+
+    def hand_material(self, team):
+        return sum(PIECE_VALUES[piece_type] * count for piece_type, count in self.board._hands[team].items())
+
+    def win_condition(self):
+        """Same as Board.check_win_condition_bool, from the counters."""
+        self._sync_queens()
+        if self.queen_neighbors[0] == 6:
+            return -1
+        if self.queen_neighbors[1] == 6:
+            return 1
+        return 0
+
+    def score(self):
+        """White's score of the position, without the win check."""
+        self._sync_queens()
+        if self.mobility:
+            self._update_mobility()
+            movement = self.mobility_score[0] - self.mobility_score[1]
+        else:
+            movement = self.distance[0] - self.distance[1]
+        return movement + QUEEN_SURROUND_WEIGHT * (self.queen_neighbors[1] - self.queen_neighbors[0])
+
+    def terms(self):
+        self._sync_queens()
+        if self.mobility:
+            self._update_mobility()
+        return {
+            "queen_neighbors": tuple(self.queen_neighbors),
+            "hand_material": (self.hand_material(0), self.hand_material(1)),
+            "distance": tuple(self.distance),
+            "mobility": tuple(self.mobility_score) if self.mobility else None,
+            # exact reachable cells per type_index, whatever the estimate says
+            "moves": (self.board.mobility(0)[0], self.board.mobility(1)[0]),
+        }
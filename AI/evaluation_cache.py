@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+# entries kept per partition, the least recently used go first
+EVALUATION_CACHE_ENTRIES = 100000
+
+
+class EvaluationCache:
+    """
+    Static evaluations by Board.position_key(), in front of
+    StateTree.evaluate_board. Leaves come back across add_level passes,
+    transpositions and turns, and a hit skips the evaluator.
+
+    Only scores that depend on nothing but the position belong here.
+    Scores of different evaluator settings (IncrementalEvaluator.config)
+    differ for the same position, each setting gets a partition of its own
+    with max_entries in least recently used order. Lookups are counted per
+    difficulty.
+    """
+
+    def __init__(self, max_entries=EVALUATION_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._partitions = {}
+        self.lookups = {}
+        self.hits = {}
+        self.evictions = 0
+
+    def __len__(self):
+        return sum(len(partition) for partition in self._partitions.values())
+
+    def get(self, config, key, difficulty):
+        """
+        Returns:
+            float: the stored evaluation, None when the position isn't cached.
+        """
+        self.lookups[difficulty] = self.lookups.get(difficulty, 0) + 1
+        partition = self._partitions.get(config)
+        if partition is None:
+            return None
+        value = partition.get(key)
+        if value is None:
+            return None
+        partition.move_to_end(key)
+        self.hits[difficulty] = self.hits.get(difficulty, 0) + 1
+        return value
+
+    def put(self, config, key, value):
+        partition = self._partitions.get(config)
+        if partition is None:
+            partition = self._partitions[config] = OrderedDict()
+        partition[key] = value
+        partition.move_to_end(key)
+        if len(partition) > self.max_entries:
+            partition.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._partitions.clear()
+
+    def hit_rate(self, difficulty):
+        lookups = self.lookups.get(difficulty, 0)
+        return self.hits.get(difficulty, 0) / lookups if lookups else 0.0
+
+    def stats(self):
+        """Lookups, hits and hit rate per difficulty."""
+        return {
+            difficulty: {
+                "lookups": lookups,
+                "hits": self.hits.get(difficulty, 0),
+                "hit_rate": self.hit_rate(difficulty),
+            }
+            for difficulty, lookups in self.lookups.items()
+        }
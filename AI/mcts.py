@@ -0,0 +1,295 @@
+import math
+import random
+import time
+from array import array
+
+from utils.board import DEFAULT_STAGE_ORDER, STAGE_ATTACK, STAGE_ESCAPE
+from utils.moves import MOVE_TYPECODE, NO_MOVE
+
+# selection formulas
+UCT = "uct"
+PUCT = "puct"
+
+# playout policies
+RANDOM_PLAYOUT = "random"
+HEURISTIC_PLAYOUT = "heuristic"
+
+EXPLORATION = {UCT: 1.4, PUCT: 2.0}
+# plies a playout runs before the evaluation decides it
+PLAYOUT_DEPTH = 16
+# evaluation score that counts as three quarters of a win
+EVALUATION_SCALE = 1000
+# chance a heuristic playout plays a move closing in on the enemy queen
+HEURISTIC_ATTACK_PROBABILITY = 0.6
+# prior weight of the moves of every generator stage, for PUCT
+STAGE_PRIORS = {STAGE_ATTACK: 4.0, STAGE_ESCAPE: 2.0}
+MAX_NODES = 1000000
+
+# expanded flag of a node
+NOT_EXPANDED = 0
+EXPANDING = 1
+EXPANDED = 2
+
+
+class MCTS:
+    """
+    Monte Carlo tree search played on the board with make_move/unmake_move.
+
+    Nodes live in parallel arrays indexed by node number, the children of a
+    node are numbered consecutively from first_child. Values are kept from
+    the point of view of the team that played the move into the node, a win
+    counts 1 and a loss -1.
+    """
+
+    def __init__(self, board, evaluate=None, selection=UCT, exploration=None,
+                 playout_policy=HEURISTIC_PLAYOUT, playout_depth=PLAYOUT_DEPTH, seed=None):
+        """
+        Args:
+            board (Board): searched in place, back in its position after every playout.
+            evaluate (callable): white's score of the board's position (like
+            StateTree.evaluate_board) for playouts that run out of plies,
+            None counts them as draws.
+            selection (str): UCT or PUCT.
+            exploration (float): exploration constant, a default per formula.
+            playout_policy (str): RANDOM_PLAYOUT or HEURISTIC_PLAYOUT.
+            playout_depth (int): plies a playout runs at most.
+            seed: seed of the playouts' random moves.
+        """
+        self.board = board
+        self.evaluate = evaluate
+        self.selection = selection
+        self.exploration = exploration if exploration is not None else EXPLORATION[selection]
+        self.playout_policy = playout_policy
+        self.playout_depth = playout_depth
+        self._random = random.Random(seed)
+        # losses added to the path of a playout until it is backed up, steers
+        # searches sharing the tree away from each other (0 when alone)
+        self.virtual_loss = 0
+
+        self.playouts = 0
+        self.elapsed = 0.0
+        self._reset()
+
+    def _reset(self):
+        self.parent = array('l', [-1])
+        self.move = array(MOVE_TYPECODE, [NO_MOVE])
+        self.first_child = array('l', [0])
+        self.child_count = array('l', [0])
+        self.expanded = array('b', [0])
+        # team that played the move into the node
+        self.team = array('b', [1 - self.board._turn_number % 2])
+        self.visits = array('l', [0])
+        self.value = array('d', [0.0])
+        self.prior = array('d', [1.0])
+
+    def __len__(self):
+        return len(self.parent)
+
+    def playouts_per_second(self):
+        return self.playouts / self.elapsed if self.elapsed else 0.0
+
+    def stats(self):
+        return {
+            "playouts": self.playouts,
+            "nodes": len(self),
+            "seconds": self.elapsed,
+            "playouts_per_second": self.playouts_per_second(),
+        }
+
+    def search(self, max_time=None, max_playouts=None, max_nodes=MAX_NODES):
+        """
+        Grows a new tree from the board's position until one of the budgets
+        runs out (at least one has to be given).
+        Returns:
+            int: the most visited root move, None when there is nothing to play.
+        """
+        if max_time is None and max_playouts is None:
+            raise ValueError("MCTS needs a time or a playout budget.")
+        self._reset()
+        self.playouts = 0
+        start = time.time()
+        deadline = start + max_time if max_time is not None else None
+
+        while True:
+            self.run_playout()
+            self.elapsed = time.time() - start
+            if max_playouts is not None and self.playouts >= max_playouts:
+                break
+            if deadline is not None and start + self.elapsed >= deadline:
+                break
+            if len(self) >= max_nodes or (self.expanded[0] == EXPANDED and not self.child_count[0]):
+                break
+        return self.best_move()
+
+    def best_move(self):
+        child = self.best_child(0)
+        return self.move[child] if child is not None else None
+
+    def best_child(self, node):
+        """Most visited child of the node, None if it has none."""
+        first = self.first_child[node]
+        count = self.child_count[node]
+        if not count:
+            return None
+        visits = self.visits
+        return max(range(first, first + count), key=visits.__getitem__)
+
+    def root_value(self):
+        """Mean value of the best root child for the side to move, in [-1, 1]."""
+        child = self.best_child(0)
+        if child is None or not self.visits[child]:
+            return 0.0
+        return self.value[child] / self.visits[child]
+
+    def run_playout(self):
+        """Selection, expansion, playout and backpropagation of one playout."""
+        board = self.board
+        node = 0
+        played = 0
+        try:
+            while self.expanded[node] == EXPANDED and self.child_count[node]:
+                node = self._select_child(node)
+                self._add_virtual_loss(node)
+                board.make_move(self.move[node])
+                played += 1
+
+            if self.expanded[node] == NOT_EXPANDED and self._claim(node):
+                self._expand(node)
+                if self.child_count[node]:
+                    node = self._select_child(node)
+                    self._add_virtual_loss(node)
+                    board.make_move(self.move[node])
+                    played += 1
+
+            result = self._playout()
+        finally:
+            for _ in range(played):
+                board.unmake_move()
+
+        self._backpropagate(node, result)
+        self.playouts += 1
+
+    def _add_virtual_loss(self, node):
+        if self.virtual_loss:
+            self.visits[node] += self.virtual_loss
+            self.value[node] -= self.virtual_loss
+
+    def _backpropagate(self, node, result):
+        visits = self.visits
+        value = self.value
+        team = self.team
+        parent = self.parent
+        virtual_loss = self.virtual_loss
+        while node != -1:
+            # the root never gets a virtual loss
+            undo = virtual_loss if parent[node] != -1 else 0
+            visits[node] += 1 - undo
+            value[node] += (result if team[node] == 0 else -result) + undo
+            node = parent[node]
+
+    def _select_child(self, node):
+        first = self.first_child[node]
+        count = self.child_count[node]
+        visits = self.visits
+        value = self.value
+        exploration = self.exploration
+        parent_visits = visits[node]
+
+        best_child = first
+        best_score = float('-inf')
+        if self.selection == UCT:
+            log_visits = math.log(parent_visits) if parent_visits else 0.0
+            for child in range(first, first + count):
+                child_visits = visits[child]
+                if not child_visits:
+                    return child
+                score = value[child] / child_visits + exploration * math.sqrt(log_visits / child_visits)
+                if score > best_score:
+                    best_child, best_score = child, score
+        else:
+            prior = self.prior
+            sqrt_visits = math.sqrt(parent_visits)
+            for child in range(first, first + count):
+                child_visits = visits[child]
+                mean = value[child] / child_visits if child_visits else 0.0
+                score = mean + exploration * prior[child] * sqrt_visits / (1 + child_visits)
+                if score > best_score:
+                    best_child, best_score = child, score
+        return best_child
+
+    def _claim(self, node):
+        """Marks the node as being expanded, False if someone else already is."""
+        if self.expanded[node] != NOT_EXPANDED:
+            return False
+        self.expanded[node] = EXPANDING
+        return True
+
+    def _expand(self, node):
+        moves = []
+        priors = []
+        for stage, stage_moves in zip(DEFAULT_STAGE_ORDER, self.board.iter_stages()):
+            weight = STAGE_PRIORS.get(stage, 1.0)
+            moves.extend(stage_moves)
+            priors.extend([weight] * len(stage_moves))
+
+        if moves:
+            total = sum(priors)
+            priors = [weight / total for weight in priors]
+        self._add_children(node, moves, priors, self.board._turn_number % 2)
+
+    def _add_children(self, node, moves, priors, team):
+        count = len(moves)
+        self.first_child[node] = len(self)
+        self.child_count[node] = count
+        self.parent.extend([node] * count)
+        self.move.extend(moves)
+        self.first_child.extend([0] * count)
+        self.child_count.extend([0] * count)
+        self.expanded.extend(bytes(count))
+        self.team.extend([team] * count)
+        self.visits.extend([0] * count)
+        self.value.extend([0.0] * count)
+        self.prior.extend(priors)
+        self.expanded[node] = EXPANDED
+
+    def _playout_move(self):
+        board = self.board
+        if self.playout_policy == HEURISTIC_PLAYOUT:
+            stages = list(board.iter_stages())
+            if stages and stages[0] and self._random.random() < HEURISTIC_ATTACK_PROBABILITY:
+                return self._random.choice(stages[0])
+            moves = [move for stage_moves in stages for move in stage_moves]
+        else:
+            moves = board.generate_moves()
+        return self._random.choice(moves) if moves else None
+
+    def _playout(self):
+        """Plays random moves from the position, returns white's result in [-1, 1]."""
+        board = self.board
+        played = 0
+        try:
+            for _ in range(self.playout_depth):
+                if board.check_win_condition_bool():
+                    break
+                move = self._playout_move()
+                if move is None:
+                    break
+                board.make_move(move)
+                played += 1
+            return self._position_value()
+        finally:
+            for _ in range(played):
+                board.unmake_move()
+
+    def _position_value(self):
+        result = self.board.check_win_condition_bool()
+        if result:
+            return float(result)
+        if self.evaluate is None:
+            return 0.0
+        score = self.evaluate()
+        if score == float('inf'):
+            return 1.0
+        if score == float('-inf'):
+            return -1.0
+        return math.tanh(score / EVALUATION_SCALE)
@@ -0,0 +1,120 @@
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.board import Board
+
+# one pool for the whole game, starting processes costs more than a search
+_executor = None
+_workers = 0
+# best root score found so far, shared by every worker
+_shared_bound = None
+
+# per worker process: the snapshot its tree was built from and the tree
+_worker_tree = None
+_worker_snapshot = None
+
+
+def _init_worker(shared_bound):
+    global _shared_bound
+    _shared_bound = shared_bound
+
+
+def _get_executor(workers):
+    global _executor, _workers, _shared_bound
+    if _executor is None or _workers != workers:
+        if _executor is not None:
+            _executor.shutdown()
+        _shared_bound = multiprocessing.Value('d', 0.0)
+        _executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(_shared_bound,))
+        _workers = workers
+    return _executor
+
+
+def shutdown():
+    """Stops the worker processes, the next search starts new ones."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+atexit.register(shutdown)
+
+
+def _search_root_move(snapshot, move, depth, max_min, difficulty):
+    """
+    Runs in a worker: searches one root move of the position with the best
+    score the other workers found so far as the bound to beat.
+    Returns:
+        tuple: (move, score, nodes searched).
+    """
+    # the tree module needs this one, so it is imported here
+    from .state_tree import StateTree
+    global _worker_tree, _worker_snapshot
+
+    tree = _worker_tree
+    if tree is None or _worker_snapshot != snapshot or tree.difficulty != difficulty:
+        table = tree.table if tree is not None else None
+        tree = _worker_tree = StateTree(Board.from_snapshot(snapshot), depth, difficulty, table=table)
+        _worker_snapshot = snapshot
+    board = tree._board_state
+    searcher = tree.searcher
+    searcher.reset_stats()
+
+    shared_bound = _shared_bound
+    # set by _init_worker when the pool started the process
+    assert shared_bound is not None
+    bound = shared_bound.value
+    board.make_move(move)
+    try:
+        if max_min:
+            score, _ = searcher.search(depth - 1, False, bound, float('inf'))
+        else:
+            score, _ = searcher.search(depth - 1, True, float('-inf'), bound)
+    finally:
+        board.unmake_move()
+
+    with shared_bound.get_lock():
+        if score > shared_bound.value if max_min else score < shared_bound.value:
+            shared_bound.value = score
+    return move, score, searcher.nodes
+
+
+def parallel_root_search(board, depth, max_min, difficulty, workers=None):
+    """
+    Splits the root moves of the board across a process pool. Each worker
+    rebuilds the board from a snapshot and searches its moves with the best
+    score found so far by any worker as the bound, so later moves get
+    tighter windows. The first move (the most promising one) is searched
+    alone to set that bound before the rest are handed out.
+    Args:
+        board (Board): position to search, it is not changed.
+        depth (int): number of plies to look ahead.
+        max_min (bool): True when the side to move maximizes (white).
+        difficulty (str): evaluation setting of the workers' trees.
+        workers (int): number of processes, all cores by default.
+    Returns:
+        tuple: (score, best move, nodes searched by all workers).
+    """
+    moves = list(board.iter_moves())
+    if not moves:
+        return None, None, 0
+
+    executor = _get_executor(workers or os.cpu_count() or 1)
+    snapshot = board.snapshot()
+    # _get_executor made it along with the pool
+    assert _shared_bound is not None
+    _shared_bound.value = float('-inf') if max_min else float('inf')
+
+    results = [executor.submit(_search_root_move, snapshot, moves[0], depth, max_min, difficulty).result()]
+    futures = [executor.submit(_search_root_move, snapshot, move, depth, max_min, difficulty) for move in moves[1:]]
+    results.extend(future.result() for future in futures)
+
+    # moves that only failed against the bound can't beat the best one
+    best_move, best_score, _ = results[0]
+    for move, score, _ in results[1:]:
+        if score > best_score if max_min else score < best_score:
+            best_move, best_score = move, score
+    return best_score, best_move, sum(nodes for _, _, nodes in results)
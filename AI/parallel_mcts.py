@@ -0,0 +1,320 @@
+import atexit
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from utils.board import Board
+from .mcts import MCTS, UCT, NOT_EXPANDED, EXPANDED
+
+# nodes the shared tree has room for
+TREE_CAPACITY = 500000
+# losses a playout adds to its path in the shared tree until it is backed up
+VIRTUAL_LOSS = 1
+
+# (name, memoryview format) of every node array of the shared tree
+_FIELDS = (
+    ("parent", 'q'), ("move", 'Q'), ("first_child", 'q'), ("child_count", 'q'),
+    ("visits", 'q'), ("value", 'd'), ("prior", 'd'), ("expanded", 'b'), ("team", 'b'),
+)
+_ITEM_SIZES = {'q': 8, 'Q': 8, 'd': 8, 'b': 1}
+
+
+class SharedTreeStore:
+    """
+    The node arrays of MCTS in one shared memory block, plus the number of
+    nodes in use, so processes can grow a single tree together.
+    """
+
+    def __init__(self, capacity=TREE_CAPACITY, name=None):
+        size = 8 + capacity * sum(_ITEM_SIZES[kind] for _, kind in _FIELDS)
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.capacity = capacity
+
+        buf = self._shm.buf
+        assert buf is not None
+        self.count = buf[0:8].cast('q')
+        self.views = {}
+        offset = 8
+        for field, kind in _FIELDS:
+            length = capacity * _ITEM_SIZES[kind]
+            # the checker only takes literal formats, these come from _FIELDS
+            self.views[field] = buf[offset:offset + length].cast(kind)  # pyright: ignore[reportCallIssue, reportArgumentType]
+            offset += length
+        self._closed = False
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def reset(self, root_team):
+        """Empties the tree down to a root whose move was played by root_team."""
+        buf = self._shm.buf
+        assert buf is not None
+        buf[:] = bytes(len(buf))
+        views = self.views
+        views["parent"][0] = -1
+        views["prior"][0] = 1.0
+        views["team"][0] = root_team
+        self.count[0] = 1
+
+    def close(self):
+        # the views have to go before the block, or closing it fails
+        if self._closed:
+            return
+        self._closed = True
+        self.count.release()
+        for view in self.views.values():
+            view.release()
+        self.views = {}
+        self._shm.close()
+
+    def __del__(self):
+        if not getattr(self, "_closed", True):
+            self.close()
+
+    def unlink(self):
+        self.close()
+        self._shm.unlink()
+
+
+class SharedMCTS(MCTS):
+    """
+    MCTS over a SharedTreeStore. Every process runs its own playouts on its
+    own board, the statistics are updated without locks and a virtual loss
+    keeps the processes from all following the same path. Only claiming a
+    node for expansion and reserving its children take the lock.
+    """
+
+    def __init__(self, board, store, lock, evaluate=None, selection=UCT, seed=None, virtual_loss=VIRTUAL_LOSS):
+        self._store = store
+        self._lock = lock
+        super().__init__(board, evaluate, selection=selection, seed=seed)
+        self.virtual_loss = virtual_loss
+
+    def _reset(self):
+        # the tree is emptied by whoever owns the store, not by every process
+        for field, view in self._store.views.items():
+            setattr(self, field, view)
+
+    def __len__(self):
+        return self._store.count[0]
+
+    def _claim(self, node):
+        with self._lock:
+            return super()._claim(node)
+
+    def _add_children(self, node, moves, priors, team):
+        count = len(moves)
+        store = self._store
+        with self._lock:
+            first = store.count[0]
+            if first + count > store.capacity:
+                # the tree is full, the node stays a leaf
+                count = 0
+            else:
+                store.count[0] = first + count
+
+        for index in range(count):
+            child = first + index
+            self.parent[child] = node
+            self.move[child] = moves[index]
+            self.first_child[child] = 0
+            self.child_count[child] = 0
+            self.expanded[child] = NOT_EXPANDED
+            self.team[child] = team
+            self.visits[child] = 0
+            self.value[child] = 0.0
+            self.prior[child] = priors[index]
+        self.first_child[node] = first
+        self.child_count[node] = count
+        # published last, other processes only descend into expanded nodes
+        self.expanded[node] = EXPANDED
+
+
+# per worker process: the snapshot its tree was built from and the tree,
+# which only serves as the evaluation of the playouts
+_worker_tree = None
+_worker_snapshot = None
+_worker_store = None
+_worker_lock = None
+
+
+def _worker_evaluator(snapshot, difficulty):
+    # the tree module needs this one, so it is imported here
+    from .state_tree import StateTree
+    global _worker_tree, _worker_snapshot
+
+    tree = _worker_tree
+    if tree is None or _worker_snapshot != snapshot or tree.difficulty != difficulty:
+        tree = _worker_tree = StateTree(Board.from_snapshot(snapshot), 1, difficulty)
+        _worker_snapshot = snapshot
+    return tree
+
+
+def _root_worker(index, snapshot, max_time, difficulty, selection):
+    """Runs in a worker: an independent tree, returns its root statistics."""
+    tree = _worker_evaluator(snapshot, difficulty)
+    mcts = MCTS(tree._board_state, tree.evaluate_board, selection=selection, seed=index)
+    mcts.search(max_time=max_time)
+    first = mcts.first_child[0]
+    children = [
+        (mcts.move[child], mcts.visits[child], mcts.value[child])
+        for child in range(first, first + mcts.child_count[0])
+    ]
+    return children, mcts.playouts
+
+
+def _init_tree_worker(store_name, capacity, lock):
+    global _worker_store, _worker_lock
+    _worker_store = SharedTreeStore(capacity, name=store_name)
+    _worker_lock = lock
+
+
+def _tree_worker(index, snapshot, max_time, difficulty, selection):
+    """Runs in a worker: playouts into the shared tree until the time is up."""
+    tree = _worker_evaluator(snapshot, difficulty)
+    mcts = SharedMCTS(tree._board_state, _worker_store, _worker_lock, tree.evaluate_board, selection=selection, seed=index)
+    mcts.search(max_time=max_time)
+    return mcts.playouts
+
+
+# pools (and the shared tree) live for the whole game
+_root_executor = None
+_root_workers = 0
+_tree_executor = None
+_tree_workers = 0
+_tree_store = None
+
+
+def _get_root_executor(workers):
+    global _root_executor, _root_workers
+    if _root_executor is None or _root_workers != workers:
+        if _root_executor is not None:
+            _root_executor.shutdown()
+        _root_executor = ProcessPoolExecutor(max_workers=workers)
+        _root_workers = workers
+    return _root_executor
+
+
+def _get_tree_executor(workers):
+    global _tree_executor, _tree_workers, _tree_store
+    if _tree_executor is None or _tree_workers != workers:
+        if _tree_executor is not None:
+            _tree_executor.shutdown()
+        if _tree_store is None:
+            _tree_store = SharedTreeStore(TREE_CAPACITY)
+        lock = multiprocessing.Lock()
+        _tree_executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_tree_worker, initargs=(_tree_store.name, TREE_CAPACITY, lock)
+        )
+        _tree_workers = workers
+    return _tree_executor
+
+
+def shutdown():
+    """Stops the worker processes and frees the shared tree."""
+    global _root_executor, _tree_executor, _tree_store
+    if _root_executor is not None:
+        _root_executor.shutdown()
+        _root_executor = None
+    if _tree_executor is not None:
+        _tree_executor.shutdown()
+        _tree_executor = None
+    if _tree_store is not None:
+        _tree_store.unlink()
+        _tree_store = None
+
+
+atexit.register(shutdown)
+
+
+def _throughput(playouts, seconds, workers):
+    per_second = playouts / seconds if seconds else 0.0
+    return {
+        "workers": workers,
+        "playouts": playouts,
+        "seconds": seconds,
+        "playouts_per_second": per_second,
+        "playouts_per_second_per_core": per_second / workers,
+    }
+
+
+def root_parallel_mcts(board, max_time, difficulty, workers=None, selection=UCT):
+    """
+    Root parallelism: every worker grows its own tree from the position, the
+    root children are merged by adding up their visits.
+    Args:
+        board (Board): position to search, it is not changed.
+        max_time (float): seconds every worker searches for.
+        difficulty (str): evaluation setting of the workers' trees.
+        workers (int): number of processes, all cores by default.
+        selection (str): UCT or PUCT.
+    Returns:
+        tuple: (best move, its mean value for the side to move, throughput stats).
+    """
+    workers = workers or os.cpu_count() or 1
+    executor = _get_root_executor(workers)
+    snapshot = board.snapshot()
+
+    start = time.time()
+    futures = [executor.submit(_root_worker, index, snapshot, max_time, difficulty, selection) for index in range(workers)]
+    results = [future.result() for future in futures]
+    seconds = time.time() - start
+
+    visits = {}
+    values = {}
+    for children, _ in results:
+        for move, child_visits, child_value in children:
+            visits[move] = visits.get(move, 0) + child_visits
+            values[move] = values.get(move, 0.0) + child_value
+
+    stats = _throughput(sum(playouts for _, playouts in results), seconds, workers)
+    if not visits:
+        return None, 0.0, stats
+    move = max(visits, key=visits.__getitem__)
+    return move, values[move] / visits[move] if visits[move] else 0.0, stats
+
+
+def tree_parallel_mcts(board, max_time, difficulty, workers=None, selection=UCT):
+    """
+    Tree parallelism: every worker runs playouts into one tree kept in
+    shared memory, using virtual loss to spread out over it.
+    Args and returns are the same as root_parallel_mcts.
+    """
+    workers = workers or os.cpu_count() or 1
+    executor = _get_tree_executor(workers)
+    store = _tree_store
+    # _get_tree_executor made it along with the pool
+    assert store is not None
+    snapshot = board.snapshot()
+    store.reset(1 - board._turn_number % 2)
+
+    start = time.time()
+    futures = [executor.submit(_tree_worker, index, snapshot, max_time, difficulty, selection) for index in range(workers)]
+    playouts = sum(future.result() for future in futures)
+    seconds = time.time() - start
+
+    views = store.views
+    stats = _throughput(playouts, seconds, workers)
+    first, count = views["first_child"][0], views["child_count"][0]
+    if not count:
+        return None, 0.0, stats
+    best = max(range(first, first + count), key=views["visits"].__getitem__)
+    child_visits = views["visits"][best]
+    return views["move"][best], views["value"][best] / child_visits if child_visits else 0.0, stats
+
+
+def measure_scaling(board, worker_counts, max_time, difficulty, tree_parallel=False, selection=UCT):
+    """
+    Throughput of root or tree parallel MCTS for every number of workers,
+    e.g. measure_scaling(board, [1, 2, 4, 8, 16, 32], 5, PLAYER_DIFFICULTY_EASY).
+    Returns:
+        list: the throughput stats of every run.
+    """
+    search = tree_parallel_mcts if tree_parallel else root_parallel_mcts
+    return [search(board, max_time, difficulty, workers, selection)[2] for workers in worker_counts]
@@ -0,0 +1,144 @@
+import multiprocessing
+import queue
+import time
+from collections import namedtuple
+
+from utils.board import Board
+from .search import SearchTimeout
+from .smp import SharedTranspositionTable
+
+# plies of the search guessing the opponent's reply
+PREDICTION_DEPTH = 2
+# a pondering search stops by itself after this many seconds
+PONDER_MAX_TIME = 120
+# seconds between checks that the pondering process is still alive
+RESULT_POLL_INTERVAL = 0.1
+
+# predicted: the opponent move pondered on, move/score: best answer found,
+# depth: last completed iteration, seconds: time spent on the answer
+PonderResult = namedtuple("PonderResult", ["predicted", "move", "score", "depth", "seconds"])
+
+
+def _ponder(snapshot, difficulty, pvs, max_min, table_name, max_time, stop_event, results):
+    """
+    Runs in the pondering process: guesses the opponent's reply, plays it
+    and searches the answer until stopped. The shared table keeps whatever
+    was found for the search that follows.
+    """
+    # the tree module needs this one, so it is imported here
+    from .state_tree import StateTree
+
+    table = SharedTranspositionTable(name=table_name)
+    result = None
+    try:
+        tree = StateTree(Board.from_snapshot(snapshot), 1, difficulty, table=table)
+        searcher = tree.searcher
+        searcher.should_stop = stop_event.is_set
+        searcher.pvs = pvs
+        board = tree._board_state
+
+        try:
+            _, predicted = searcher.search(PREDICTION_DEPTH, not max_min)
+            if predicted is not None:
+                board.make_move(predicted)
+                start = time.time()
+                score, move = searcher.iterative_search(max_time, max_min)
+                if move is not None:
+                    result = PonderResult(predicted, move, score, searcher.depth_reached, time.time() - start)
+        except SearchTimeout:
+            # stopped before the first iteration completed
+            pass
+    finally:
+        # the parent waits for a result, even when the search failed
+        results.put(result)
+        table.close()
+
+
+class Ponderer:
+    """
+    Searches on the opponent's time: after the AI moves, a background process
+    predicts the opponent's reply and searches the answer to it. The AI's
+    searcher has to use a SharedTranspositionTable, the pondering process
+    fills the same table, so its work is reused even on a wrong guess.
+    """
+
+    def __init__(self, table, difficulty, pvs=False, max_time=PONDER_MAX_TIME):
+        self.table = table
+        self.difficulty = difficulty
+        self.pvs = pvs
+        self.max_time = max_time
+        self._process = None
+        self._stop_event = None
+        self._results = None
+        self.hits = 0
+        self.misses = 0
+
+    def is_pondering(self):
+        return self._process is not None
+
+    def start(self, board, max_min):
+        """
+        Starts pondering the board's position, where the opponent is to move.
+        Args:
+            board (Board): position right after the AI's move, it is not changed.
+            max_min (bool): True if the AI maximizes (plays white).
+        """
+        self.cancel()
+        self._stop_event = multiprocessing.Event()
+        self._results = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_ponder,
+            args=(board.snapshot(), self.difficulty, self.pvs, max_min, self.table.name, self.max_time, self._stop_event, self._results),
+            daemon=True,
+        )
+        self._process.start()
+
+    def stop(self, actual_move):
+        """
+        Stops pondering once the opponent has moved.
+        Args:
+            actual_move (int): encoded move the opponent played.
+        Returns:
+            PonderResult: the pondered answer if the guess was right, else None.
+        """
+        if self._process is None:
+            return None
+        result = self._collect()
+
+        if result is not None and result.predicted == actual_move:
+            self.hits += 1
+            return result
+        self.misses += 1
+        return None
+
+    def cancel(self):
+        """Stops pondering without using the result (e.g. the game is over)."""
+        if self._process is not None:
+            self._collect()
+
+    def _collect(self):
+        """
+        Stops the process and waits for it.
+        Returns:
+            PonderResult: its result, None if it had none or died without one.
+        """
+        process, stop_event, results = self._process, self._stop_event, self._results
+        # start() sets all three together
+        assert process is not None and stop_event is not None and results is not None
+        stop_event.set()
+        result = None
+        while True:
+            try:
+                result = results.get(timeout=RESULT_POLL_INTERVAL)
+                break
+            except queue.Empty:
+                if not process.is_alive():
+                    # it may have put the result right before exiting
+                    try:
+                        result = results.get(timeout=RESULT_POLL_INTERVAL)
+                    except queue.Empty:
+                        pass
+                    break
+        process.join()
+        self._process = None
+        return result
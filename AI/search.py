@@ -0,0 +1,402 @@
+import random
+import time
+
+from utils.cell import distance
+from utils.moves import NO_MOVE, is_deploy, move_from, move_to, type_and_destination
+from .transposition import TranspositionTable, bound_type
+
+# half width of the window searched around the previous iteration's score
+ASPIRATION_WINDOW = 50
+# how many nodes are searched between two looks at the clock
+CLOCK_CHECK_INTERVAL = 64
+# plies the killer table has room for
+MAX_PLY = 64
+# killer moves remembered per ply
+KILLER_SLOTS = 2
+
+# late move reductions: moves sorted at least LMR_MIN_INDEX-th at nodes with
+# at least LMR_MIN_DEPTH plies left are searched LMR_REDUCTION plies shallower
+# when they are quiet (end further than LMR_QUIET_DISTANCE from both queens)
+LMR_MIN_DEPTH = 3
+LMR_MIN_INDEX = 4
+LMR_REDUCTION = 1
+LMR_QUIET_DISTANCE = 2
+
+# null-move pruning: the side to move passes and the opponent gets a search
+# NULL_MOVE_REDUCTION plies shallower, skipped when our queen has at least
+# NULL_MOVE_QUEEN_DANGER neighbours
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_QUEEN_DANGER = 4
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the deadline of iterative_search passes."""
+
+
+class Searcher:
+    """
+    Depth-first alpha-beta search played directly on the board with
+    make_move/unmake_move. Only the current path (the recursion) and the
+    principal variation are kept in memory, no matter how deep it searches.
+
+    Scores are from white's point of view like StateTree.evaluate_board, so
+    white maximizes and black minimizes.
+    """
+
+    def __init__(self, board, evaluate, table=None, aspiration_window=ASPIRATION_WINDOW, pvs=False,
+                 lmr=False, null_move=False, null_move_verify=True):
+        self.board = board
+        self.evaluate = evaluate
+        self.table = table if table is not None else TranspositionTable()
+        self.aspiration_window = aspiration_window
+        # principal variation search (NegaScout): every move after the first
+        # is searched with a null window and only re-searched if it fails high
+        self.pvs = pvs
+        # late move reductions and null moves trade exactness for depth, both
+        # are off unless a mode asks for them
+        self.lmr = lmr
+        self.lmr_min_depth = LMR_MIN_DEPTH
+        self.lmr_min_index = LMR_MIN_INDEX
+        self.lmr_reduction = LMR_REDUCTION
+        self.lmr_quiet_distance = LMR_QUIET_DISTANCE
+        # verified null-move pruning: a failing high null move only cuts off
+        # when verification is off for the subtree, otherwise the node is
+        # searched one ply shallower (and fully again if that doesn't cut)
+        self.null_move = null_move
+        self.null_move_verify = null_move_verify
+        self.null_move_min_depth = NULL_MOVE_MIN_DEPTH
+        self.null_move_reduction = NULL_MOVE_REDUCTION
+        self.null_move_queen_danger = NULL_MOVE_QUEEN_DANGER
+        # shuffles moves before the history sort so equal ones come in a
+        # different order, for helper searches that shouldn't all agree
+        self._order_noise = None
+        # polled with the clock, a search aborts with SearchTimeout once it
+        # returns True (e.g. a pondering search whose guess got answered)
+        self.should_stop = None
+        self.principal_variation = []
+        self._previous_pv = []
+        self._follow_pv = False
+        self._deadline = None
+        self.nodes = 0
+        self.leaves = 0
+        self.depth_reached = 0
+        self.researches = 0
+        self.scout_researches = 0
+        self.null_move_cutoffs = 0
+        self.null_move_verifications = 0
+        self.lmr_reductions = 0
+        self.lmr_researches = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        # moves that caused a cut-off at each ply, tried right after the
+        # principal variation and table moves
+        self.killers = [[NO_MOVE] * KILLER_SLOTS for _ in range(MAX_PLY)]
+        # type_and_destination(move) -> how much cut-offs it caused, kept
+        # across iterations and turns (halved at every new search)
+        self.history = {}
+
+    def reset_stats(self):
+        self.nodes = self.leaves = self.depth_reached = self.researches = 0
+        self.scout_researches = 0
+        self.null_move_cutoffs = self.null_move_verifications = 0
+        self.lmr_reductions = self.lmr_researches = 0
+        self.cutoffs = self.first_move_cutoffs = 0
+
+    def stats(self):
+        return {
+            "nodes": self.nodes,
+            "leaves": self.leaves,
+            "depth_reached": self.depth_reached,
+            "researches": self.researches,
+            "scout_researches": self.scout_researches,
+            "null_move_cutoffs": self.null_move_cutoffs,
+            "null_move_verifications": self.null_move_verifications,
+            "lmr_reductions": self.lmr_reductions,
+            "lmr_researches": self.lmr_researches,
+            "cutoffs": self.cutoffs,
+            "first_move_cutoff_rate": self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+            "table": self.table.stats(),
+        }
+
+    def set_order_noise(self, seed):
+        """Breaks history ties randomly from the seed, None turns it off."""
+        self._order_noise = random.Random(seed) if seed is not None else None
+
+    def _new_search(self):
+        self.table.new_search()
+        self._previous_pv = []
+        self._deadline = None
+        self.killers = [[NO_MOVE] * KILLER_SLOTS for _ in range(MAX_PLY)]
+        history = self.history
+        for key in list(history):
+            history[key] >>= 1
+            if not history[key]:
+                del history[key]
+
+    def search(self, depth, max_min, alpha=float('-inf'), beta=float('inf')):
+        """
+        Searches the current position of the board.
+        Args:
+            depth (int): number of plies to look ahead.
+            max_min (bool): True when the side to move maximizes (white).
+            alpha (float), beta (float): search window.
+        Returns:
+            tuple: (score, best move), the move is None when there is nothing to play.
+        """
+        self._new_search()
+        return self._search_root(depth, max_min, alpha, beta)
+
+    def iterative_search(self, max_time, max_min, max_depth=64, depth_offset=0):
+        """
+        Iterative deepening bounded by the clock. Every iteration tries the
+        previous principal variation first and searches a narrow window
+        around the previous score, widening it when the score falls outside.
+        The deadline is checked inside the search, an unfinished iteration is
+        thrown away.
+        Args:
+            max_time (float): seconds to search for.
+            max_min (bool): True when the side to move maximizes (white).
+            max_depth (int): depth to stop at even if there is time left.
+            depth_offset (int): added to the depth of every iteration after
+            the first, so parallel helpers search different depths.
+        Returns:
+            tuple: (score, best move) of the last completed iteration.
+        """
+        # the first iteration always completes so there is a move to play
+        self._new_search()
+        deadline = time.time() + max_time
+
+        score, move = self._search_root(1, max_min, float('-inf'), float('inf'))
+        self.depth_reached = 1
+        self._deadline = deadline
+        for depth in range(2 + depth_offset, max_depth + 1):
+            if move is None or time.time() >= deadline:
+                break
+            self._previous_pv = self.principal_variation
+            try:
+                if abs(score) == float('inf'):
+                    new_score, new_move = self._search_root(depth, max_min, float('-inf'), float('inf'))
+                else:
+                    alpha = score - self.aspiration_window
+                    beta = score + self.aspiration_window
+                    new_score, new_move = self._search_root(depth, max_min, alpha, beta)
+                    if new_score <= alpha or new_score >= beta:
+                        self.researches += 1
+                        self._previous_pv = self.principal_variation
+                        new_score, new_move = self._search_root(depth, max_min, float('-inf'), float('inf'))
+            except SearchTimeout:
+                break
+            score, move = new_score, new_move
+            self.depth_reached = depth
+
+        self._deadline = None
+        return score, move
+
+    def _search_root(self, depth, max_min, alpha, beta):
+        pv = [[] for _ in range(depth + 1)]
+        self._follow_pv = bool(self._previous_pv)
+        score = self._alphabeta(depth, max_min, alpha, beta, 0, pv, False, self.null_move_verify)
+        self.principal_variation = pv[0]
+        return score, (pv[0][0] if pv[0] else None)
+
+    def _ordered_moves(self, ply, *first_moves):
+        """
+        Principal variation and table moves first, then the killers of the
+        ply, then every stage of Board.iter_stages sorted by history.
+        """
+        board = self.board
+        tried = []
+        for move in first_moves:
+            if move is not None and move not in tried and board.is_playable(move):
+                tried.append(move)
+                yield move
+        if ply < MAX_PLY:
+            for move in self.killers[ply]:
+                if move != NO_MOVE and move not in tried and board.is_legal(move):
+                    tried.append(move)
+                    yield move
+
+        history = self.history
+        order_noise = self._order_noise
+        for moves in board.iter_stages():
+            if order_noise is not None:
+                order_noise.shuffle(moves)
+            if history:
+                moves.sort(key=lambda move: history.get(type_and_destination(move), 0), reverse=True)
+            for move in moves:
+                if move not in tried:
+                    yield move
+
+    def _record_cutoff(self, move, depth, ply):
+        key = type_and_destination(move)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers.pop()
+                killers.insert(0, move)
+
+    def _is_quiet(self, move, queen_cells):
+        destination = move_to(move)
+        for queen_cell in queen_cells:
+            if distance(destination, queen_cell) <= self.lmr_quiet_distance:
+                return False
+            # leaving a queen's side isn't quiet either
+            if not is_deploy(move) and distance(move_from(move), queen_cell) <= 1:
+                return False
+        return True
+
+    def _null_move(self, depth, max_min, alpha, beta, ply, pv, verify):
+        """
+        Searches the position after passing the turn with a null window at
+        the bound the side to move has to beat. Returns True if the side to
+        move fails high (low for the minimizing side) even without moving.
+        """
+        board = self.board
+        reduced_depth = max(0, depth - 1 - self.null_move_reduction)
+        board.make_null_move()
+        try:
+            if max_min:
+                score = self._alphabeta(reduced_depth, False, beta - 1, beta, ply + 1, pv, False, verify)
+            else:
+                score = self._alphabeta(reduced_depth, True, alpha, alpha + 1, ply + 1, pv, False, verify)
+        finally:
+            board.unmake_move()
+        return score >= beta if max_min else score <= alpha
+
+    def _alphabeta(self, depth, max_min, alpha, beta, ply, pv, allow_null=True, verify=True):
+        board = self.board
+        self.nodes += 1
+        pv[ply] = []
+
+        if self.nodes % CLOCK_CHECK_INTERVAL == 0 and (
+            (self._deadline is not None and time.time() >= self._deadline) or
+            (self.should_stop is not None and self.should_stop())
+        ):
+            raise SearchTimeout()
+
+        if depth == 0:
+            self.leaves += 1
+            return self.evaluate()
+
+        key = board.position_key()
+        table_score, table_move = self.table.probe(key, depth, alpha, beta)
+        # the root always searches to get a move to play
+        if table_score is not None and ply > 0:
+            if table_move is not None:
+                pv[ply] = [table_move]
+            return table_score
+        alpha_original, beta_original = alpha, beta
+
+        team = 0 if max_min else 1
+        queen_cells = [cell for cell in (board.queen_cell(0), board.queen_cell(1)) if cell is not None]
+
+        # while still on the previous principal variation, its move goes first
+        pv_move = None
+        if self._follow_pv:
+            if ply < len(self._previous_pv):
+                pv_move = self._previous_pv[ply]
+            else:
+                self._follow_pv = False
+
+        null_move_failed_high = False
+        if (
+            self.null_move and allow_null and ply > 0 and beta - alpha <= 1 and not self._follow_pv and
+            depth >= self.null_move_min_depth and len(queen_cells) == 2 and
+            abs(beta if max_min else alpha) != float('inf') and
+            board.queen_neighbors(team) < self.null_move_queen_danger
+        ):
+            if self._null_move(depth, max_min, alpha, beta, ply, pv, verify):
+                if not verify:
+                    self.null_move_cutoffs += 1
+                    return beta if max_min else alpha
+                # verify it with a shallower search of the real moves
+                self.null_move_verifications += 1
+                null_move_failed_high = True
+                depth -= 1
+                verify = False
+
+        while True:
+            # the bound of the side to move, best_move tells if a move was searched
+            best_score = float('-inf') if max_min else float('inf')
+            best_move = None
+            killers = self.killers[ply] if ply < MAX_PLY else ()
+            for index, move in enumerate(self._ordered_moves(ply, pv_move, table_move)):
+                if move != pv_move:
+                    self._follow_pv = False
+                # never at the root or on the principal variation (full window)
+                reduced = (
+                    self.lmr and ply > 0 and beta - alpha <= 1 and
+                    index >= self.lmr_min_index and depth >= self.lmr_min_depth and
+                    move != table_move and move not in killers and self._is_quiet(move, queen_cells)
+                )
+                board.make_move(move)
+                try:
+                    # stays None unless the reduced search already showed the move is no better
+                    score = None
+                    if reduced:
+                        # null window at the bound, a full search only if it beats it
+                        self.lmr_reductions += 1
+                        reduced_depth = depth - 1 - self.lmr_reduction
+                        if max_min:
+                            score = self._alphabeta(reduced_depth, False, alpha, alpha + 1, ply + 1, pv, True, verify)
+                            if score > alpha:
+                                score = None
+                        else:
+                            score = self._alphabeta(reduced_depth, True, beta - 1, beta, ply + 1, pv, True, verify)
+                            if score < beta:
+                                score = None
+                        if score is None:
+                            self.lmr_researches += 1
+
+                    if score is not None:
+                        pass
+                    elif index == 0 or not self.pvs:
+                        score = self._alphabeta(depth - 1, not max_min, alpha, beta, ply + 1, pv, True, verify)
+                    else:
+                        # scores are whole numbers, so a window of 1 is a null window
+                        if max_min:
+                            score = self._alphabeta(depth - 1, False, alpha, alpha + 1, ply + 1, pv, True, verify)
+                        else:
+                            score = self._alphabeta(depth - 1, True, beta - 1, beta, ply + 1, pv, True, verify)
+                        if alpha < score < beta:
+                            self.scout_researches += 1
+                            score = self._alphabeta(depth - 1, not max_min, alpha, beta, ply + 1, pv, True, verify)
+                finally:
+                    board.unmake_move()
+                self._follow_pv = False
+
+                if best_move is None or (score > best_score if max_min else score < best_score):
+                    best_score = score
+                    best_move = move
+                    pv[ply] = [move] + pv[ply + 1]
+
+                if max_min:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if beta <= alpha:  # cut-off
+                    self.cutoffs += 1
+                    if index == 0:
+                        self.first_move_cutoffs += 1
+                    self._record_cutoff(move, depth, ply)
+                    break
+
+            if null_move_failed_high and best_move is not None and beta > alpha:
+                # the null move was wrong (zugzwang), search again at full depth
+                # with the null moves below verified again
+                null_move_failed_high = False
+                depth += 1
+                verify = True
+                alpha, beta = alpha_original, beta_original
+                continue
+            break
+
+        if best_move is None:
+            # nothing to play, the game is over
+            self.leaves += 1
+            return self.evaluate()
+
+        self.table.store(key, depth, best_score, bound_type(best_score, alpha_original, beta_original), best_move)
+        return best_score
@@ -0,0 +1,283 @@
+import atexit
+import os
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from utils.board import Board
+from .transposition import EXACT, LOWER_BOUND, UPPER_BOUND
+
+# every slot is three 64-bit words: key ^ score ^ data, score, data
+# data packs the best move (52 bits), depth + 1 (7 bits, 0 = empty),
+# the bound flag (2 bits) and the generation (3 bits)
+SLOT_WORDS = 3
+MOVE_BITS = (1 << 52) - 1
+DEPTH_SHIFT = 52
+FLAG_SHIFT = 59
+GENERATION_SHIFT = 61
+MAX_DEPTH = 126
+
+_DOUBLE = struct.Struct('<d')
+_QWORD = struct.Struct('<Q')
+
+
+def _score_bits(score):
+    return _QWORD.unpack(_DOUBLE.pack(score))[0]
+
+
+def _bits_score(bits):
+    return _DOUBLE.unpack(_QWORD.pack(bits))[0]
+
+
+class SharedTranspositionTable:
+    """
+    TranspositionTable stored in a multiprocessing.shared_memory block, so
+    every search process reads and writes the same entries without locks.
+
+    A slot is written as three separate words, so another process may read
+    it half written. The first word stores the key xor-ed with the other two
+    (the xor trick): a torn slot doesn't give its key back and is treated as
+    a miss.
+    """
+
+    def __init__(self, memory_mb=16, name=None):
+        if name is None:
+            slots = max(2, int(memory_mb * 1024 * 1024) // (8 * SLOT_WORDS))
+            self._shm = shared_memory.SharedMemory(create=True, size=slots * 8 * SLOT_WORDS)
+            self._owner = True
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        buffer = self._shm.buf
+        assert buffer is not None
+        self._words = buffer.cast('Q')
+        self._closed = False
+        self._buckets = len(self._words) // (2 * SLOT_WORDS)
+        if self._owner:
+            self.clear()
+        self._generation = 0
+
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __len__(self):
+        return self._buckets * 2
+
+    def close(self):
+        # the view has to go before the block, or closing it fails
+        if self._closed:
+            return
+        self._closed = True
+        self._words.release()
+        self._shm.close()
+
+    def __del__(self):
+        if not getattr(self, "_closed", True):
+            self.close()
+
+    def unlink(self):
+        """Frees the shared block, only the process that created it should."""
+        self.close()
+        self._shm.unlink()
+
+    def new_search(self):
+        """Marks entries of previous searches as stale so they get replaced first."""
+        self._generation = (self._generation + 1) & 7
+
+    def clear(self):
+        self._words[:] = array('Q', bytes(len(self._words) * 8))
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = self.hits = self.cutoffs = self.stores = self.overwrites = 0
+
+    def stats(self):
+        return {
+            "slots": len(self),
+            "probes": self.probes,
+            "hits": self.hits,
+            "cutoffs": self.cutoffs,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+        }
+
+    def _read(self, slot):
+        """Returns (key, score bits, data) of a slot, key is 0 when empty."""
+        words = self._words
+        index = slot * SLOT_WORDS
+        check, score, data = words[index], words[index + 1], words[index + 2]
+        if not data:
+            return 0, 0, 0
+        return check ^ score ^ data, score, data
+
+    def _find(self, key):
+        slot = (key % self._buckets) * 2
+        for slot in (slot, slot + 1):
+            stored_key, score, data = self._read(slot)
+            if data and stored_key == key:
+                return score, data
+        return None
+
+    def get(self, key):
+        """
+        Returns:
+            tuple: (depth, score, flag, move) stored for the key, or None.
+        """
+        entry = self._find(key)
+        if entry is None:
+            return None
+        score, data = entry
+        return ((data >> DEPTH_SHIFT) & 0x7F) - 1, _bits_score(score), (data >> FLAG_SHIFT) & 3, (data & MOVE_BITS) or None
+
+    def probe(self, key, depth, alpha, beta):
+        """Same as TranspositionTable.probe."""
+        self.probes += 1
+        entry = self._find(key)
+        if entry is None:
+            return None, None
+
+        self.hits += 1
+        score, data = entry
+        move = (data & MOVE_BITS) or None
+        if ((data >> DEPTH_SHIFT) & 0x7F) - 1 >= depth:
+            score = _bits_score(score)
+            flag = (data >> FLAG_SHIFT) & 3
+            if flag == EXACT or (flag == LOWER_BOUND and score >= beta) or (flag == UPPER_BOUND and score <= alpha):
+                self.cutoffs += 1
+                return score, move
+        return None, move
+
+    def store(self, key, depth, score, flag, move=None):
+        slot = (key % self._buckets) * 2
+
+        # depth-preferred slot: same position, empty, stale or shallower
+        stored_key, _, data = self._read(slot)
+        if data and not (
+            stored_key == key or (data >> GENERATION_SHIFT) != self._generation or
+            ((data >> DEPTH_SHIFT) & 0x7F) - 1 <= depth
+        ):
+            # otherwise the always-replace slot
+            slot += 1
+            stored_key, _, data = self._read(slot)
+
+        if data and stored_key != key:
+            self.overwrites += 1
+        elif move is None and data:
+            # keep the best move of the previous search of the same position
+            move = (data & MOVE_BITS) or None
+
+        score = _score_bits(score)
+        data = (
+            (move or 0) | ((min(depth, MAX_DEPTH) + 1) << DEPTH_SHIFT) |
+            (flag << FLAG_SHIFT) | (self._generation << GENERATION_SHIFT)
+        )
+        words = self._words
+        index = slot * SLOT_WORDS
+        words[index + 1] = score
+        words[index + 2] = data
+        words[index] = key ^ score ^ data
+        self.stores += 1
+
+
+# the shared table and pool live for the whole game
+_executor = None
+_workers = 0
+_table = None
+
+# per worker process
+_worker_table = None
+_worker_tree = None
+_worker_snapshot = None
+
+
+def _init_worker(table_name):
+    global _worker_table
+    _worker_table = SharedTranspositionTable(name=table_name)
+
+
+def _get_executor(workers, memory_mb):
+    global _executor, _workers, _table
+    if _executor is None or _workers != workers:
+        shutdown()
+        _table = SharedTranspositionTable(memory_mb)
+        _executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(_table.name,))
+        _workers = workers
+    return _executor
+
+
+def shutdown():
+    """Stops the worker processes and frees the shared table."""
+    global _executor, _table
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+    if _table is not None:
+        _table.unlink()
+        _table = None
+
+
+atexit.register(shutdown)
+
+
+def _smp_worker(index, snapshot, max_time, max_min, difficulty, max_depth):
+    """
+    Runs in a worker: a whole iterative deepening search of the root. The
+    helpers (index > 0) search odd depths or shuffled orders so they fill
+    the shared table with entries the others can use.
+    Returns:
+        tuple: (index, depth reached, score, move, nodes searched).
+    """
+    # the tree module needs this one, so it is imported here
+    from .state_tree import StateTree
+    global _worker_tree, _worker_snapshot
+
+    tree = _worker_tree
+    if tree is None or _worker_snapshot != snapshot or tree.difficulty != difficulty:
+        tree = _worker_tree = StateTree(Board.from_snapshot(snapshot), 1, difficulty, table=_worker_table)
+        _worker_snapshot = snapshot
+    searcher = tree.searcher
+    searcher.reset_stats()
+    searcher.set_order_noise(index if index else None)
+
+    score, move = searcher.iterative_search(max_time, max_min, max_depth, depth_offset=index % 2)
+    return index, searcher.depth_reached, score, move, searcher.nodes
+
+
+def lazy_smp_search(board, max_time, max_min, difficulty, workers=None, memory_mb=64, max_depth=64):
+    """
+    Lazy SMP: every worker runs its own iterative deepening search of the
+    same root for max_time seconds. They share nothing but a lockless
+    transposition table, there is no split of the moves and no coordinator.
+    Args:
+        board (Board): position to search, it is not changed.
+        max_time (float): seconds every worker searches for.
+        max_min (bool): True when the side to move maximizes (white).
+        difficulty (str): evaluation setting of the workers' trees.
+        workers (int): number of processes, all cores by default.
+        memory_mb (int): size of the shared table.
+        max_depth (int): depth every worker stops at even if there is time left.
+    Returns:
+        tuple: (score, best move, nodes searched by all workers) of the
+        worker that completed the deepest iteration.
+    """
+    workers = workers or os.cpu_count() or 1
+    executor = _get_executor(workers, memory_mb)
+    snapshot = board.snapshot()
+
+    futures = [
+        executor.submit(_smp_worker, index, snapshot, max_time, max_min, difficulty, max_depth)
+        for index in range(workers)
+    ]
+    results = [future.result() for future in futures]
+
+    # deepest iteration wins, the main worker on ties
+    _, _, score, move, _ = max(results, key=lambda result: (result[1], -result[0]))
+    return score, move, sum(result[4] for result in results)
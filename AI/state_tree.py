@@ -1,47 +1,71 @@
 from utils.board import Board
-from utils.pieces.queen import Queen
-from utils.pieces.ant import Ant
-from utils.pieces.grass_hopper import Grasshopper
-from utils.pieces.beetle import Beetle
-from utils.pieces.spider import Spider
-from utils.location import Location
 from UI.constants import *
-from .state_tree_node import StateTreeNode
-from .algorithms import apply_minmax, apply_alphabeta, iterative_depening
+from .state_tree_node import NodeStore, ROOT, NO_NODE, EXPANDED
+from .algorithms import apply_minmax, apply_lazy_alphabeta
+from .transposition import TranspositionTable
+from .evaluation import IncrementalEvaluator
+from .evaluation_cache import EvaluationCache
+from .search import Searcher
+from .parallel import parallel_root_search
+from .smp import lazy_smp_search
+from .mcts import MCTS
+from .parallel_mcts import root_parallel_mcts, tree_parallel_mcts
 from random import randint
+from array import array
+
+# nodes a tree keeps between turns, the least visited subtrees go first
+MAX_RETAINED_NODES = 200000
 
 class StateTree:
 
-    def __init__(self, _board_state, _depth, difficulty = PLAYER_DIFFICULTY_EASY):
+    def __init__(self, _board_state, _depth, difficulty = PLAYER_DIFFICULTY_EASY, table = None, searcher = None, cache = None):
         self._board_state = _board_state
         self._depth = _depth
-        self._root = StateTreeNode()
+        self.nodes = NodeStore(_board_state.position_key())
+        # shared by every search mode, pass the previous tree's table (or
+        # searcher) to keep its entries across turns
+        if table is None:
+            table = searcher.table if searcher is not None else TranspositionTable()
+        self.table = table
+        if searcher is None:
+            searcher = Searcher(_board_state, self.evaluate_board, table, lmr=False, null_move=False)
+        else:
+            searcher.evaluate = self.evaluate_board
+        self.searcher = searcher
         self._leaves_count = 0
+        # moves generated for a tree grown by the search, against the
+        # children the search went into
+        self.generated_moves = 0
+        self.visited_children = 0
         self.difficulty = difficulty
+        self.evaluator = IncrementalEvaluator.attach(_board_state, mobility=difficulty != PLAYER_DIFFICULTY_EASY)
+        # pass the previous tree's cache to keep the evaluations across turns
+        self.cache = cache if cache is not None else EvaluationCache()
+        self._cache_config = self.evaluator.config()
         self.time = 1
         if self.difficulty == PLAYER_DIFFICULTY_MEDIUM:
             self.time = 5
         elif self.difficulty == PLAYER_DIFFICULTY_HARD:
             self.time = 10
 
-    def build_tree(self, node):
-        if node.move:
-            self.play_move(node.move)
+    def build_tree(self, node = ROOT):
+        nodes = self.nodes
+        if node != ROOT:
+            self.play_move(nodes.move[node])
+            nodes.key[node] = self._board_state.position_key()
 
-        if (node.depth == self._depth):
-            node.evaluation = self.evaluate_board()
+        if (nodes.depth[node] == self._depth):
+            nodes.evaluation[node] = self.evaluate_board()
         else:
-            next_possible_moves = self._board_state.get_moves_and_deploys()
+            next_possible_moves = self._board_state.generate_moves()
             if not next_possible_moves:
-                node.evaluation = self.evaluate_board()
+                nodes.evaluation[node] = self.evaluate_board()
             else:
-                for move in next_possible_moves:
-                    child_node = StateTreeNode(node, move, 0, node.depth + 1)
-                    node.children.append(child_node)
+                for child_node in nodes.add_children(node, next_possible_moves):
                     self.build_tree(child_node)
 
-        if node.move:
-            self.reverse_move(node.move)
+        if node != ROOT:
+            self.reverse_move(nodes.move[node])
 
         # if (node.depth == self._depth):
         #     node.evaluation = self.evaluate_board()
@@ -59,32 +83,32 @@ class StateTree:
         #     node.children.append(child_node)
         #     self.build_tree(child_node)
 
-    def add_level(self, node, i = 2):
-        if node.move:
-            self.play_move(node.move)
+    def add_level(self, node = ROOT, i = 2):
+        nodes = self.nodes
+        if node != ROOT:
+            self.play_move(nodes.move[node])
+            nodes.key[node] = self._board_state.position_key()
 
-        if (node.depth == self._depth):
-            node.evaluation = self.evaluate_board()
+        if (nodes.depth[node] == self._depth):
+            nodes.evaluation[node] = self.evaluate_board()
         else:
-            if (node.depth < self._depth - i):
-                if node.children:
-                    node.evaluation = 0
-                    for child_node in node.children:
+            if (nodes.depth[node] < self._depth - i):
+                if nodes.has_children(node):
+                    nodes.evaluation[node] = 0
+                    for child_node in nodes.children(node):
                         self.add_level(child_node)
             else:
-                next_possible_moves = self._board_state.get_moves_and_deploys()
+                next_possible_moves = self._board_state.generate_moves()
                 evaluation = self.evaluate_board()
-                if node != self._root and (not next_possible_moves or evaluation <= 0):
-                    node.evaluation = evaluation
+                if node != ROOT and (not next_possible_moves or evaluation <= 0):
+                    nodes.evaluation[node] = evaluation
                 else:
-                    node.evaluation = 0
-                    for move in next_possible_moves:
-                        child_node = StateTreeNode(node, move, 0, node.depth + 1)
-                        node.children.append(child_node)
+                    nodes.evaluation[node] = 0
+                    for child_node in nodes.add_children(node, next_possible_moves):
                         self.add_level(child_node)
 
-        if node.move:
-            self.reverse_move(node.move)
+        if node != ROOT:
+            self.reverse_move(nodes.move[node])
 
         # self._root.move = None
         # nodes = [self._root]
@@ -120,100 +144,144 @@ class StateTree:
         #         for move in node.move:
         #             self.reverse_move(move)
 
+    def advance(self, key):
+        """
+        Moves the root down to its child with the position key, if the tree
+        has that position.
+        Args:
+            key (int): Board.position_key() of the position reached.
+        Returns:
+            bool: False when no child has the key, the tree is left as it is.
+        """
+        nodes = self.nodes
+        for child in nodes.children(ROOT):
+            if nodes.key[child] == key:
+                self.set_root(child)
+                return True
+        return False
+
+    def set_root(self, node):
+        # only the node's subtree is copied, the old root and the siblings
+        # are freed right away
+        self.nodes = self.nodes.subtree(node)
+
+    def trim(self, max_nodes=MAX_RETAINED_NODES):
+        """
+        Cuts the least visited subtrees until at most max_nodes nodes are
+        left. A cut node stays as a leaf with its last evaluation.
+        Returns:
+            int: number of nodes left in the tree.
+        """
+        nodes = self.nodes
+        parent = nodes.parent
+        count = len(nodes)
+        if count <= max_nodes:
+            return count
+
+        # children always come after their parent
+        sizes = array('l', [1]) * count
+        for node in range(count - 1, ROOT, -1):
+            sizes[parent[node]] += sizes[node]
+
+        # unvisited branches first, the biggest of them before the rest. The
+        # root is the most visited, cutting it means the next turn rebuilds
+        visits = nodes.visits
+        candidates = sorted(
+            (node for node in range(count) if nodes.has_children(node)),
+            key=lambda node: (node == ROOT, visits[node], -sizes[node])
+        )
+        for node in candidates:
+            if count <= max_nodes:
+                break
+            # only ancestors already cut have no children
+            ancestor = parent[node]
+            while ancestor != NO_NODE and nodes.has_children(ancestor):
+                ancestor = parent[ancestor]
+            if ancestor != NO_NODE:
+                continue
+
+            removed = sizes[node] - 1
+            nodes.cut(node)
+            count -= removed
+            ancestor = parent[node]
+            while ancestor != NO_NODE:
+                sizes[ancestor] -= removed
+                ancestor = parent[ancestor]
+
+        # give the cut nodes' memory back
+        self.nodes = nodes.subtree(ROOT)
+        return count
+
+    def iter_children(self, node, first_move=None):
+        """
+        Children of the node, first_move's first, the board has to be in the
+        node's position. Children the tree doesn't have yet are generated a
+        stage at a time and only added when the iteration gets to them.
+        """
+        nodes = self.nodes
+        board = self._board_state
+        children = list(nodes.children(node))
+        last = children[-1] if children else NO_NODE
+        if first_move is not None:
+            for index, child in enumerate(children):
+                if nodes.move[child] == first_move:
+                    children.insert(0, children.pop(index))
+                    break
+            else:
+                if nodes.expansion[node] != EXPANDED and board.is_legal(first_move):
+                    last = nodes.add_child(node, first_move, last)
+                    children.insert(0, last)
+
+        for child in children:
+            yield child
+        if nodes.expansion[node] == EXPANDED:
+            return
+
+        known = {nodes.move[child] for child in children}
+        for stage_moves in board.iter_stages():
+            self.generated_moves += len(stage_moves)
+            for move in stage_moves:
+                if move not in known:
+                    last = nodes.add_child(node, move, last)
+                    yield last
+        nodes.expansion[node] = EXPANDED
+
+    def expansion_stats(self):
+        return {
+            "nodes": len(self.nodes),
+            "generated_moves": self.generated_moves,
+            "visited_children": self.visited_children,
+            "generated_per_visited": self.generated_moves / self.visited_children if self.visited_children else 0.0,
+        }
+
     def play_move(self, move):
-        source, destination = move
-        destination_x = destination.get_x()
-        destination_y = destination.get_y()
-        if (isinstance(source, str)):
-            team = 0 if (self._board_state._turn_number % 2 == 0) else 1
-            if source == "Queen":
-                piece = Queen(Location(destination_x, destination_y), team)
-            elif source == "Ant":
-                piece = Ant(Location(destination_x, destination_y), team)
-            elif source == "Beetle":
-                piece = Beetle(Location(destination_x, destination_y), team)
-            elif source == "Grasshopper":
-                piece = Grasshopper(Location(destination_x, destination_y), team)
-            elif source == "Spider":
-                piece = Spider(Location(destination_x, destination_y), team)
-            Board.add_object(self._board_state, piece, True)
-        else:
-            Board.move_object(self._board_state, Location(source.get_x(), source.get_y()), Location(destination_x, destination_y), True)
+        self._board_state.make_move(move)
 
     def reverse_move(self, move):
-        destination, source = move
-        self._board_state._turn_number -= 1
-        if (isinstance(destination, str)):
-            Board.remove_object(self._board_state, Location(source.get_x(), source.get_y()))
-        else:
-            self._board_state._turn_number -= 1
-            Board.move_object(self._board_state, Location(source.get_x(), source.get_y()), Location(destination.get_x(), destination.get_y()), True)
-
-    def find_distance_to_queen(self, piece_location, queen_location):
-        place_values = [20, 12, 5, 2, 1, 0]
-
-        y_distance = abs(queen_location.get_y() - piece_location.get_y())
-        distance_to_queen = (abs(queen_location.get_x() - piece_location.get_x())) + y_distance
-        index = max(distance_to_queen//2, y_distance) - 1
-
-        if distance_to_queen == 0:
-            return place_values[1]
-        elif index < len(place_values):
-            return place_values[index]
-        else:
-            return place_values[-1]
-
+        self._board_state.unmake_move()
 
     def evaluate_board(self):
         self._leaves_count += 1
-        piece_values = {
-            "Queen": 10,
-            "Ant": 8,
-            "Beetle": 5,
-            "Grasshopper": 3,
-            "Spider": 2
-        }
-
         if self._board_state._turn_number < 8:
             return randint(-100, 3)
 
-        win_condition = self._board_state.check_win_condition_bool()
+        key = self._board_state.position_key()
+        evaluation = self.cache.get(self._cache_config, key, self.difficulty)
+        if evaluation is not None:
+            return evaluation
+
+        # the evaluator's terms follow the board, nothing is scanned here
+        win_condition = self.evaluator.win_condition()
         if win_condition == 1:
-            return float('inf')
+            evaluation = float('inf')
         elif win_condition == -1:
-            return float('-inf')
-
-        queen_surrounded_score = 0
-        d = [(2,0),(-2,0),(1,1),(-1,1),(1,-1),(-1,-1)]
-        i = -1
-        for queen in self._board_state._queens_reference:
-            x = queen._location.get_x()
-            y = queen._location.get_y()
-            for (dx,dy) in d:
-                new_location: Location = Location(x + dx, y + dy)
-                if(self._board_state.get_object(new_location)):
-                    queen_surrounded_score += i
-            i = 1
-
-        pieces_movement_score = 0
-        for location, piece in list(self._board_state._objects.items()):
-            if self.difficulty == PLAYER_DIFFICULTY_EASY:
-                piece_value = piece_values[piece.__class__.__name__]
-                if piece._team == 0:
-                    pieces_movement_score += piece_value * self.find_distance_to_queen(location, self._board_state._queens_reference[1]._location)
-                elif piece._team == 1:
-                    pieces_movement_score -= piece_value * self.find_distance_to_queen(location, self._board_state._queens_reference[0]._location)
-            else:
-                moves = piece.get_next_possible_locations(self._board_state)
-                piece_value = piece_values[piece.__class__.__name__]
-                for move in moves:
-                    if piece._team == 0:
-                        pieces_movement_score += piece_value * self.find_distance_to_queen(move, self._board_state._queens_reference[1]._location)
-                    elif piece._team == 1:
-                        pieces_movement_score -= piece_value * self.find_distance_to_queen(move, self._board_state._queens_reference[0]._location)
-
-        score = pieces_movement_score + 1000 * queen_surrounded_score
-        return score
+            evaluation = float('-inf')
+        else:
+            evaluation = self.evaluator.score()
+        # the evaluator's terms only depend on the position (not on the path
+        # to it), so the score is the same whenever the key comes back
+        self.cache.put(self._cache_config, key, evaluation)
+        return evaluation
 
     def get_next_moves(self, board_state):
 
@@ -231,19 +299,51 @@ class StateTree:
 
 
     def get_best_move(self, algorithm_type, max_min = True):
+        """
+        Returns:
+            int: the encoded move to play, None when there is none.
+        """
+        self.table.new_search()
+        nodes = self.nodes
         if algorithm_type == AI_MODE_MINMAX:
-            result = apply_minmax(self._depth, max_min, self._root)
+            # the root moves down the tree between turns, only the rest of the depth is searched
+            result = apply_minmax(self._depth - nodes.depth[ROOT], max_min, nodes, ROOT, self.table)
         elif algorithm_type == AI_MODE_ALPHA_BETA:
-            result = apply_alphabeta(self._depth, max_min, self._root)
-        elif algorithm_type == AI_MODE_ITERATIVE:
-            result = iterative_depening(self.time, max_min, self)
-        for child in self._root.children:
-            if result == child.evaluation:
-                return child
+            # the tree grows as the search goes, only the rest of the depth is searched
+            result = apply_lazy_alphabeta(self._depth - nodes.depth[ROOT], max_min, self, ROOT)
+        elif algorithm_type in AI_SEARCH_MODES:
+            self.searcher.pvs = algorithm_type in (AI_MODE_PVS, AI_MODE_SELECTIVE)
+            # only the selective mode gives up exactness for depth
+            self.searcher.lmr = self.searcher.null_move = algorithm_type == AI_MODE_SELECTIVE
+            if algorithm_type in (AI_MODE_ITERATIVE, AI_MODE_PVS, AI_MODE_SELECTIVE):
+                evaluation, move = self.searcher.iterative_search(self.time, max_min)
+            elif algorithm_type == AI_MODE_PARALLEL:
+                evaluation, move, _ = parallel_root_search(self._board_state, self._depth, max_min, self.difficulty)
+            elif algorithm_type == AI_MODE_LAZY_SMP:
+                evaluation, move, _ = lazy_smp_search(self._board_state, self.time, max_min, self.difficulty)
+            elif algorithm_type == AI_MODE_MCTS:
+                mcts = MCTS(self._board_state, self.evaluate_board)
+                move = mcts.search(max_time=self.time)
+                # the win rate is from the side to move's point of view
+                evaluation = mcts.root_value() if max_min else -mcts.root_value()
+            elif algorithm_type in (AI_MODE_MCTS_ROOT_PARALLEL, AI_MODE_MCTS_TREE_PARALLEL):
+                search = root_parallel_mcts if algorithm_type == AI_MODE_MCTS_ROOT_PARALLEL else tree_parallel_mcts
+                move, value, _ = search(self._board_state, self.time, self.difficulty)
+                evaluation = value if max_min else -value
+            else:
+                evaluation, move = self.searcher.search(self._depth, max_min)
+            # there is no tree below the root in these modes
+            if evaluation is not None:
+                nodes.evaluation[ROOT] = evaluation
+            return move
+        for child in nodes.children(ROOT):
+            if result == nodes.evaluation[child]:
+                return nodes.move[child]
+        return None
 
 if __name__== '__main__':
     board = Board()
     tree = StateTree(board, 1)
-    tree.build_tree(tree._root)
+    tree.build_tree()
 
     # tree.evaluate_board()
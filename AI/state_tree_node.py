@@ -1,17 +1,152 @@
-class StateTreeNode:
+from array import array
 
-    def __init__(self, parent = None, move = None, evaluation = 0, depth = 0):
-        self.evaluation = evaluation
-        self.move = move
-        self.children = []
-        self.parent = parent
-        self.depth = depth
+from utils.moves import MOVE_TYPECODE, NO_MOVE
 
-    def print_tree(self):
-        if self.children == []:
+# index of the root, NodeStore.subtree always puts it first
+ROOT = 0
+# first_child / next_sibling / parent of a node that has none
+NO_NODE = -1
+
+# expansion state of a node of a tree grown during the search
+UNEXPANDED = 0
+# a leaf holding its static evaluation
+EVALUATED = 1
+# every child is in the tree
+EXPANDED = 2
+
+
+class NodeStore:
+    """
+    The nodes of a StateTree in parallel arrays indexed by node number,
+    instead of one object (with its dict and children list) per node.
+    The children of a node are linked through first_child and next_sibling.
+
+    Nodes are only ever added. Cutting a subtree just unlinks it, subtree()
+    copies what is still reachable into a new store to give the memory back.
+    """
+
+    def __init__(self, root_key=0, root_depth=0):
+        self.parent = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.move = array(MOVE_TYPECODE)
+        self.evaluation = array('d')
+        self.depth = array('h')
+        # Board.position_key() of the position after the move
+        self.key = array('Q')
+        # times a search entered the node, across turns
+        self.visits = array('i')
+        self.expansion = array('b')
+        self._append(NO_NODE, NO_MOVE, root_depth, root_key, 0.0, 0, UNEXPANDED)
+
+    def __len__(self):
+        return len(self.parent)
+
+    def _append(self, parent, move, depth, key, evaluation, visits, expansion):
+        self.parent.append(parent)
+        self.first_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        self.move.append(move)
+        self.evaluation.append(evaluation)
+        self.depth.append(depth)
+        self.key.append(key)
+        self.visits.append(visits)
+        self.expansion.append(expansion)
+
+    def children(self, node):
+        child = self.first_child[node]
+        next_sibling = self.next_sibling
+        while child != NO_NODE:
+            yield child
+            child = next_sibling[child]
+
+    def has_children(self, node):
+        return self.first_child[node] != NO_NODE
+
+    def add_children(self, node, moves):
+        """
+        Adds a child per move after the node's current children.
+        Returns:
+            range: indices of the new children, in the order of the moves.
+        """
+        count = len(moves)
+        first = len(self)
+        if not count:
+            return range(first, first)
+
+        self.parent.extend([node] * count)
+        self.first_child.extend([NO_NODE] * count)
+        self.next_sibling.extend(range(first + 1, first + count))
+        self.next_sibling.append(NO_NODE)
+        self.move.extend(moves)
+        self.evaluation.extend([0.0] * count)
+        self.depth.extend([self.depth[node] + 1] * count)
+        self.key.extend([0] * count)
+        self.visits.extend([0] * count)
+        self.expansion.extend(bytes(count))
+
+        last = NO_NODE
+        for last in self.children(node):
+            pass
+        if last == NO_NODE:
+            self.first_child[node] = first
+        else:
+            self.next_sibling[last] = first
+        return range(first, first + count)
+
+    def add_child(self, node, move, previous=NO_NODE):
+        """
+        Adds one child right after previous, which has to be the node's last
+        child (NO_NODE when it has none).
+        Returns:
+            int: index of the child.
+        """
+        child = len(self)
+        self._append(node, move, self.depth[node] + 1, 0, 0.0, 0, UNEXPANDED)
+        if previous == NO_NODE:
+            self.first_child[node] = child
+        else:
+            self.next_sibling[previous] = child
+        return child
+
+    def cut(self, node):
+        """Unlinks the node's children, it becomes a leaf."""
+        self.first_child[node] = NO_NODE
+        self.expansion[node] = EVALUATED
+
+    def subtree(self, root):
+        """
+        Copy of the nodes reachable from root, renumbered with root as ROOT.
+        The root loses its move and parent, its move is on the board already.
+        """
+        store = NodeStore(self.key[root], self.depth[root])
+        store.evaluation[ROOT] = self.evaluation[root]
+        store.visits[ROOT] = self.visits[root]
+        store.expansion[ROOT] = self.expansion[root]
+
+        # breadth first, store index of every node is its position in the list
+        old_nodes = [root]
+        position = 0
+        while position < len(old_nodes):
+            previous = NO_NODE
+            for child in self.children(old_nodes[position]):
+                new = len(old_nodes)
+                old_nodes.append(child)
+                store._append(position, self.move[child], self.depth[child], self.key[child],
+                              self.evaluation[child], self.visits[child], self.expansion[child])
+                if previous == NO_NODE:
+                    store.first_child[position] = new
+                else:
+                    store.next_sibling[previous] = new
+                previous = new
+            position += 1
+        return store
+
+    def print_tree(self, node=ROOT):
+        if not self.has_children(node):
             return
-        if self.depth > 0:
-            print("|   " * (self.depth-1) + "|-> ", end="")
-            print(self.move, self.evaluation)
-        for child in self.children:
-            child.print_tree()
+        if node != ROOT:
+            print("|   " * (self.depth[node]-1) + "|-> ", end="")
+            print(self.move[node], self.evaluation[node])
+        for child in self.children(node):
+            self.print_tree(child)
@@ -0,0 +1,146 @@
+from array import array
+
+from utils.moves import MOVE_TYPECODE, NO_MOVE
+
+# bound types of a stored score
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# bytes used by one slot: key, score, depth, flag, generation and best move
+ENTRY_SIZE = 8 + 8 + 1 + 1 + 1 + 8
+
+
+class TranspositionTable:
+    """
+    Fixed size table of searched positions keyed by Board.position_key().
+
+    Every bucket holds two slots, a depth-preferred slot that only gets
+    replaced by deeper (or newer) searches and an always-replace slot for
+    everything else.
+    """
+
+    def __init__(self, memory_mb=16):
+        slots = max(2, int(memory_mb * 1024 * 1024) // ENTRY_SIZE)
+        self._buckets = slots // 2
+        slots = self._buckets * 2
+
+        self._keys = array('Q', bytes(8 * slots))
+        self._scores = array('d', bytes(8 * slots))
+        self._depths = array('b', [-1]) * slots  # -1 marks an empty slot
+        self._flags = array('B', bytes(slots))
+        self._generations = array('B', bytes(slots))
+        self._moves = array(MOVE_TYPECODE, bytes(8 * slots))
+        self._generation = 0
+
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def __len__(self):
+        return self._buckets * 2
+
+    def new_search(self):
+        """Marks entries of previous searches as stale so they get replaced first."""
+        self._generation = (self._generation + 1) & 0xFF
+
+    def clear(self):
+        self._depths = array('b', [-1]) * len(self)
+        self._moves = array(MOVE_TYPECODE, bytes(8 * len(self)))
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = self.hits = self.cutoffs = self.stores = self.overwrites = 0
+
+    def stats(self):
+        return {
+            "slots": len(self),
+            "probes": self.probes,
+            "hits": self.hits,
+            "cutoffs": self.cutoffs,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+        }
+
+    def _find(self, key):
+        slot = (key % self._buckets) * 2
+        if self._depths[slot] >= 0 and self._keys[slot] == key:
+            return slot
+        slot += 1
+        if self._depths[slot] >= 0 and self._keys[slot] == key:
+            return slot
+        return -1
+
+    def get(self, key):
+        """
+        Returns:
+            tuple: (depth, score, flag, move) stored for the key, or None.
+        """
+        slot = self._find(key)
+        if slot < 0:
+            return None
+        return self._depths[slot], self._scores[slot], self._flags[slot], self._moves[slot] or None
+
+    def probe(self, key, depth, alpha, beta):
+        """
+        Looks a position up before searching it.
+        Args:
+            key (int): position key.
+            depth (int): remaining depth the position is about to be searched to.
+            alpha (float), beta (float): current search window.
+        Returns:
+            tuple: (score, move), score is not None when the stored entry is
+            deep enough to decide the node without searching it, move is the
+            best move found last time (or None) to be tried first.
+        """
+        self.probes += 1
+        slot = self._find(key)
+        if slot < 0:
+            return None, None
+
+        self.hits += 1
+        move = self._moves[slot] or None
+        if self._depths[slot] >= depth:
+            score = self._scores[slot]
+            flag = self._flags[slot]
+            if flag == EXACT or (flag == LOWER_BOUND and score >= beta) or (flag == UPPER_BOUND and score <= alpha):
+                self.cutoffs += 1
+                return score, move
+        return None, move
+
+    def store(self, key, depth, score, flag, move=None):
+        slot = (key % self._buckets) * 2
+        depths = self._depths
+
+        # depth-preferred slot: same position, empty, stale or shallower
+        if not (
+            depths[slot] < 0 or self._keys[slot] == key or
+            self._generations[slot] != self._generation or depths[slot] <= depth
+        ):
+            # otherwise the always-replace slot
+            slot += 1
+
+        if depths[slot] >= 0 and self._keys[slot] != key:
+            self.overwrites += 1
+        elif move is None and depths[slot] >= 0:
+            # keep the best move of the previous search of the same position
+            move = self._moves[slot] or None
+
+        self._keys[slot] = key
+        self._scores[slot] = score
+        depths[slot] = min(depth, 127)
+        self._flags[slot] = flag
+        self._generations[slot] = self._generation
+        self._moves[slot] = NO_MOVE if move is None else move
+        self.stores += 1
+
+
+def bound_type(score, alpha, beta):
+    """Bound type of a score returned by a search with the (alpha, beta) window."""
+    if score <= alpha:
+        return UPPER_BOUND
+    if score >= beta:
+        return LOWER_BOUND
+    return EXACT
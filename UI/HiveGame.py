@@ -10,8 +10,13 @@ from .hex_utils import (
 
 from utils.board import Board
 from utils.location import Location
+from utils.cell import cell_of
+from utils.moves import decode_move, encode_deploy, encode_move
 from utils.pieces import Ant, Beetle, Grasshopper, Queen, Spider
 from AI.state_tree import StateTree
+from AI.smp import SharedTranspositionTable
+from AI.ponder import Ponderer
+from AI.evaluation_cache import EvaluationCache
 from UI.constants import *
 
 # Screen
@@ -56,7 +61,7 @@ def draw_hex_grid(rows, cols, hex_radius, offset_x=0, offset_y=0):
 
 
 class HiveGame:
-    def __init__(self, players, players_modes, players_diff):
+    def __init__(self, players, players_modes, players_diff, ponder=True):
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         self.hexagons = draw_hex_grid(HEX_GRID, HEX_GRID, HEX_RADIUS)
         self.offset_x = 0
@@ -86,8 +91,9 @@ class HiveGame:
         # create a board
         self.board = Board(self.win_callback, self.create_alert_window)
 
-        self.human_move = [(None, None), (None, None)]
-        self.tree = [None, None]
+        self.human_move = [None, None]
+        # search trees of the AI players, None for humans
+        self.tree = []
 
         self.depth = [1, 1]
         if players_diff[0] == PLAYER_DIFFICULTY_HARD:
@@ -95,12 +101,24 @@ class HiveGame:
         if players_diff[1] == PLAYER_DIFFICULTY_HARD:
             self.depth[1] = 2
 
-        if self.players[0] != PLAYER_TYPE_HUMAN:
-            self.tree[0] = StateTree(self.board, 1, players_diff[0])
-            self.tree[0].build_tree(self.tree[0]._root)
-        if self.players[1] != PLAYER_TYPE_HUMAN:
-            self.tree[1] = StateTree(self.board, 1, players_diff[1])
-            self.tree[1].build_tree(self.tree[1]._root)
+        # searches on the opponent's time, sharing its table with the AI's searcher
+        self.ponderer = []
+        # leaf evaluations of both players, partitioned by evaluator settings
+        self.evaluation_cache = EvaluationCache()
+
+        for player in range(2):
+            tree = ponderer = None
+            if self.players[player] != PLAYER_TYPE_HUMAN:
+                if ponder and self.players_modes[player] in AI_PONDER_MODES:
+                    table = SharedTranspositionTable()
+                    tree = StateTree(self.board, 1, players_diff[player], table=table, cache=self.evaluation_cache)
+                    ponderer = Ponderer(table, players_diff[player], self.players_modes[player] == AI_MODE_PVS)
+                else:
+                    tree = StateTree(self.board, 1, players_diff[player], cache=self.evaluation_cache)
+                if self.players_modes[player] not in AI_SEARCH_MODES + AI_LAZY_TREE_MODES:
+                    tree.build_tree()
+            self.tree.append(tree)
+            self.ponderer.append(ponderer)
 
         self.background_image = pygame.image.load(os.path.join("assets", "background_game.png"))
         self.background_image = pygame.transform.scale(self.background_image, (WIDTH, HEIGHT))
@@ -134,29 +152,54 @@ class HiveGame:
 
 
     def prompt_ai_for_play(self):
-        skip = False
-        for child_node in self.tree[self.current_player]._root.children:
-            try:
-                if child_node.move == self.human_move[self.current_player - 1]:
-                    child_node.move = None
-                    self.tree[self.current_player]._root = child_node
-                    break
-            except Exception:
-                pass
+        player = self.current_player
+        mode = self.players_modes[player]
+        if mode in AI_SEARCH_MODES:
+            # searched on the board itself, only the searcher is kept across turns
+            previous_tree = self.tree[player]
+            self.tree[player] = StateTree(self.board, self.depth[player]+1, self.players_diff[player], searcher=previous_tree.searcher, cache=self.evaluation_cache)
+
+            chosen_move = None
+            ponderer = self.ponderer[player]
+            if ponderer is not None:
+                pondered = ponderer.stop(self.human_move[1 - player])
+                # a right guess counts when it searched as deep (or as long) as this turn would
+                if pondered is not None and (
+                    pondered.depth >= self.tree[player]._depth if mode == AI_MODE_DEPTH_FIRST else pondered.seconds >= self.tree[player].time
+                ):
+                    chosen_move = pondered.move
+            if chosen_move is None:
+                chosen_move = self.tree[player].get_best_move(mode, player == 0)
+
+            self.play_ai_move(chosen_move)
+            if ponderer is not None and not self.won:
+                ponderer.start(self.board, player == 0)
+            return
+
+        # the opponent's reply is found by the position it leads to
+        tree = self.tree[player]
+        if tree.advance(self.board.position_key()):
+            tree._leaves_count = 0
+            tree._depth += 2
+            if mode not in AI_LAZY_TREE_MODES:
+                tree.add_level()
         else:
-            self.tree[self.current_player] = StateTree(self.board, self.depth[self.current_player]+1)
-            self.tree[self.current_player].build_tree(self.tree[self.current_player]._root)
-            skip = True
-
-        if not skip:
-            self.tree[self.current_player]._leaves_count = 0
-            self.tree[self.current_player]._depth += 2
-            self.tree[self.current_player].add_level(self.tree[self.current_player]._root)
-
-        chosen_node = self.tree[self.current_player].get_best_move(self.players_modes[self.current_player], self.current_player == 0)
-
-        self.tree[self.current_player]._root = chosen_node
-        source, destination = chosen_node.move
+            tree = StateTree(self.board, self.depth[player]+1, self.players_diff[player], table=tree.table, cache=self.evaluation_cache)
+            if mode not in AI_LAZY_TREE_MODES:
+                tree.build_tree()
+            self.tree[player] = tree
+
+        move = tree.get_best_move(mode, player == 0)
+        self.play_ai_move(move)
+
+        # keep only the chosen subtree, bounded, for the next turn
+        tree.advance(self.board.position_key())
+        tree.trim()
+
+    def play_ai_move(self, move):
+        # the other player's tree or ponderer looks for it
+        self.human_move[self.current_player] = move
+        source, destination = decode_move(move)
         destination_x = destination.get_x()
         destination_y = destination.get_y()
 
@@ -277,6 +320,11 @@ class HiveGame:
 
             pygame.display.flip()
 
+        for ponderer in self.ponderer:
+            if ponderer is not None:
+                ponderer.cancel()
+                ponderer.table.unlink()
+
     def init_piece_holder(self):
         # Initialize hands for both teams
         self.hands.append([
@@ -381,7 +429,7 @@ class HiveGame:
                 piece_class, piece_index = self.selected_piece[0], self.selected_piece[1]
 
                 if piece_class:
-                    self.human_move[self.current_player] = (piece_class.__name__, location)
+                    self.human_move[self.current_player] = encode_deploy(piece_class.type_index, cell_of(location))
                     team = self.board._turn_number % 2
                     piece = piece_class(location, team)
                     if self.board.add_object(piece):
@@ -389,9 +437,12 @@ class HiveGame:
                         self.selected_piece = [None, None]
                     break
                 else:
-                    self.human_move[self.current_player] = (self.piece_to_be_moved._location, location)
-                    old_location = self.piece_to_be_moved.get_location()
-                    self.board.move_object(self.piece_to_be_moved._location, location)
+                    moved_piece = self.piece_to_be_moved
+                    # only the moves of a selected piece are shown
+                    assert moved_piece is not None
+                    self.human_move[self.current_player] = encode_move(moved_piece.type_index, moved_piece.get_cell(), cell_of(location))
+                    old_location = moved_piece.get_location()
+                    self.board.move_object(moved_piece._location, location)
                     self.next_possible_locations.clear()
                     # clear the pieces rect
                     self.pieces_rect.clear()
@@ -31,6 +31,24 @@ PLAYER_TYPE_AI = "AI"
 AI_MODE_MINMAX = "Min-Max"
 AI_MODE_ALPHA_BETA = "Alpha-Beta"
 AI_MODE_ITERATIVE = "Iterative"
+AI_MODE_DEPTH_FIRST = "Depth-First"
+AI_MODE_PVS = "PVS"
+# PVS with late move reductions and null-move pruning, not an exact search
+AI_MODE_SELECTIVE = "Selective"
+AI_MODE_PARALLEL = "Parallel"
+AI_MODE_LAZY_SMP = "Lazy SMP"
+AI_MODE_MCTS = "MCTS"
+AI_MODE_MCTS_ROOT_PARALLEL = "Root MCTS"
+AI_MODE_MCTS_TREE_PARALLEL = "Tree MCTS"
+# modes searching the board directly, without building a StateTree
+AI_SEARCH_MODES = (
+    AI_MODE_ITERATIVE, AI_MODE_DEPTH_FIRST, AI_MODE_PVS, AI_MODE_SELECTIVE, AI_MODE_PARALLEL, AI_MODE_LAZY_SMP,
+    AI_MODE_MCTS, AI_MODE_MCTS_ROOT_PARALLEL, AI_MODE_MCTS_TREE_PARALLEL,
+)
+# tree modes whose tree grows during the search instead of being built first
+AI_LAZY_TREE_MODES = (AI_MODE_ALPHA_BETA,)
+# modes that keep searching on the opponent's time
+AI_PONDER_MODES = (AI_MODE_ITERATIVE, AI_MODE_DEPTH_FIRST, AI_MODE_PVS, AI_MODE_SELECTIVE)
 
 PLAYER_DIFFICULTY_EASY = "Easy"
 PLAYER_DIFFICULTY_MEDIUM = "Medium"
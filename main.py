@@ -91,6 +91,21 @@ def difficulty_menu(player_num):
         pygame.display.update()    
 #mode menu
 def mode_menu(player_num):
+    # (button text, mode), laid out in two columns
+    modes = [
+        ("Min-Max", AI_MODE_MINMAX),
+        ("Alpha-Beta", AI_MODE_ALPHA_BETA),
+        ("Iterative", AI_MODE_ITERATIVE),
+        ("Depth-First", AI_MODE_DEPTH_FIRST),
+        ("PVS", AI_MODE_PVS),
+        ("Selective", AI_MODE_SELECTIVE),
+        ("Parallel", AI_MODE_PARALLEL),
+        ("Lazy SMP", AI_MODE_LAZY_SMP),
+        ("MCTS", AI_MODE_MCTS),
+        ("Root MCTS", AI_MODE_MCTS_ROOT_PARALLEL),
+        ("Tree MCTS", AI_MODE_MCTS_TREE_PARALLEL),
+    ]
+
     while True:
         SCREEN.blit(BG, (0, 0))
 
@@ -101,17 +116,18 @@ def mode_menu(player_num):
         MENU_TEXT = get_font(75).render(Text, True, "#b68f40")
         MENU_RECT = MENU_TEXT.get_rect(center=(400, 100))
 
-        MINMAX_BUTTON = Button(image=pygame.image.load("assets/Rect.png"), pos=(400, 250), 
-                            text_input="Min-Max", font=get_font(65), base_color="#d7fcd4", hovering_color="White")
-        ALPHABETA_BUTTON = Button(image=pygame.image.load("assets/Rect.png"), pos=(400, 380), 
-                            text_input="Alpha-Beta", font=get_font(65), base_color="#d7fcd4", hovering_color="White")
-        ITERATIVE_BUTTON = Button(image=pygame.image.load("assets/Rect.png"), pos=(400, 510), 
-                            text_input="Iterative Deepening", font=get_font(65), base_color="#d7fcd4", hovering_color="White")
+        # six rows of shorter buttons fit under the title
+        MODE_IMAGE = pygame.transform.scale(pygame.image.load("assets/SmallRect.png"), (320, 70))
+        MODE_BUTTONS = []
+        for index, (text, mode) in enumerate(modes):
+            pos = (220 if index % 2 == 0 else 580, 180 + 76 * (index // 2))
+            MODE_BUTTONS.append((Button(image=MODE_IMAGE, pos=pos, 
+                            text_input=text, font=get_font(55), base_color="#d7fcd4", hovering_color="White"), mode))
 
         SCREEN.blit(MENU_TEXT, MENU_RECT)
 
         #hovering
-        for button in [MINMAX_BUTTON, ALPHABETA_BUTTON, ITERATIVE_BUTTON]:
+        for button, _ in MODE_BUTTONS:
             button.changeColor(MENU_MOUSE_POS)
             button.update(SCREEN)
         
@@ -124,48 +140,20 @@ def mode_menu(player_num):
             
             global first_player_mode, second_player_mode
             if event.type == pygame.MOUSEBUTTONDOWN:
-                #play button click
-                if MINMAX_BUTTON.checkForInput(MENU_MOUSE_POS):
-                    if player_num == 1:
-                        first_player_mode = AI_MODE_MINMAX
-                        pygame.mixer.music.load('assets/menu-sound.mp3')
-                        pygame.mixer.music.play(1)
-                        difficulty_menu(1)
-                        return
-                    else:
-                        second_player_mode = AI_MODE_MINMAX
-                        pygame.mixer.music.load('assets/menu-sound.mp3')
-                        pygame.mixer.music.play(1)
-                        difficulty_menu(2)
-                        return
-                #options button click
-                if ALPHABETA_BUTTON.checkForInput(MENU_MOUSE_POS):
-                    if player_num == 1:
-                        first_player_mode = AI_MODE_ALPHA_BETA
-                        pygame.mixer.music.load('assets/menu-sound.mp3')
-                        pygame.mixer.music.play(1)
-                        difficulty_menu(1)
-                        return
-                    else:
-                        second_player_mode = AI_MODE_ALPHA_BETA
-                        pygame.mixer.music.load('assets/board-start.mp3')
-                        pygame.mixer.music.play(1)
-                        difficulty_menu(2)
-                        return
-                #quit button click
-                if ITERATIVE_BUTTON.checkForInput(MENU_MOUSE_POS):
-                    if player_num == 1:
-                        first_player_mode = AI_MODE_ITERATIVE
-                        pygame.mixer.music.load('assets/menu-sound.mp3')
-                        pygame.mixer.music.play(1)
-                        difficulty_menu(1)
-                        return
-                    else:
-                        second_player_mode = AI_MODE_ITERATIVE
-                        pygame.mixer.music.load('assets/board-start.mp3')
-                        pygame.mixer.music.play(1)
-                        difficulty_menu(2)
-                        return
+                for button, mode in MODE_BUTTONS:
+                    if button.checkForInput(MENU_MOUSE_POS):
+                        if player_num == 1:
+                            first_player_mode = mode
+                            pygame.mixer.music.load('assets/menu-sound.mp3')
+                            pygame.mixer.music.play(1)
+                            difficulty_menu(1)
+                            return
+                        else:
+                            second_player_mode = mode
+                            pygame.mixer.music.load('assets/board-start.mp3')
+                            pygame.mixer.music.play(1)
+                            difficulty_menu(2)
+                            return
 
         pygame.display.update()    
 
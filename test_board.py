@@ -1,14 +1,23 @@
+import random
+
 from utils.location import Location
 from utils.board import Board
+from utils.cell import NEIGHBOR_OFFSETS, cell_of
+from utils.zobrist import SIDE_KEY, piece_key
 from utils.pieces.grass_hopper import Grasshopper
 from utils.pieces.spider import Spider
 from utils.pieces.ant import Ant
 from utils.pieces.queen import Queen
 from utils.pieces.beetle import Beetle
 
+
+def new_board():
+    return Board(lambda team: None, lambda *args: None)
+
+
 def test_hive_broken():
     print("---------------------Testing Hive breaking move--------------------")
-    board = Board()
+    board = new_board()
     locations = [
             Location(0, 0), Location(2, 0), Location(1, 1),
             Location(2, 2), Location(0, 2)
@@ -18,14 +27,19 @@ def test_hive_broken():
         insect = Grasshopper(location, 0)
         board.add_object(insect)
 
+    # the fourth grasshopper has to be the queen
+    assert len(board._objects) == 3
+
     if board.check_if_hive_valid(locations[0], Location(3, 3)):
         print("Hive is valid after move")
     else:
         print("Invalid move will break hive")
+    assert not board.check_if_hive_valid(locations[0], Location(3, 3))
+    assert board.check_if_hive_valid(locations[0], Location(3, 1))
 
 def test_ant_movement():
     print("---------------------testing ant movement---------------------------")
-    board = Board()
+    board = new_board()
     locations = [
             Location(0, 0), Location(2, 0), Location(1, 1),
             Location(2, 2), Location(0, 2)
@@ -38,11 +52,17 @@ def test_ant_movement():
         namla = Ant(location, 0)
         board.add_object(namla)
 
-    print(board.get_object(locations[-1]).get_next_possible_locations(board))
+    ant = board.get_object(locations[-1])
+    assert ant is not None
+    destinations = ant.get_next_possible_locations(board)
+    print(destinations)
+    # an ant walks around the whole hive, except where only it touched it
+    assert {cell_of(location) for location in destinations} <= board.perimeter()
+    assert len(destinations) == 10
 
 def test_beetle_movement():
     print("---------------------testing beetle movement---------------------------")
-    board = Board()
+    board = new_board()
     locations = [
             Location(0, 0), Location(2, 0), Location(1, 1),
             Location(2, 2), Location(0, 2)
@@ -56,12 +76,17 @@ def test_beetle_movement():
         board.add_object(beetle)
     
     print("Possible locations for beetle:")
-    print(board.get_object(locations[-1]).get_next_possible_locations(board))
+    beetle = board.get_object(locations[-1])
+    assert beetle is not None
+    destinations = beetle.get_next_possible_locations(board)
+    print(destinations)
+    # two climbs and two slides
+    assert set(destinations) == {Location(1, 1), Location(2, 2), Location(-1, 1), Location(1, 3)}
 
 
 # Example Usage
 # try:
-#     board = Board()
+#     board = new_board()
 #     loc1 = Location(5, 10)
 #     grasshopper1 = Grasshopper(loc1)
 #     loc2 = Location(15, 20)
@@ -123,7 +148,7 @@ def get_moves_and_deploys(board):
 
     team_pieces = board.filter_team_pieces()
 
-    for piece in team_pieces:
+    for piece in team_pieces.values():
         start_location = piece.get_location()
         possible_destinations = piece.get_next_possible_locations(board)
         print(f"Possible destinations for {piece}: {possible_destinations}")
@@ -135,11 +160,106 @@ def get_moves_and_deploys(board):
 
     return combined_results
 
-try:
+
+def random_positions(seed, plies=40):
+    """Plays random moves with make_move, yields the board after every one."""
+    rnd = random.Random(seed)
+    board = new_board()
+    for _ in range(plies):
+        moves = board.generate_moves()
+        if not moves or board.check_win_condition_bool():
+            return
+        board.make_move(rnd.choice(moves))
+        yield board
+
+
+def stacks(board):
+    """cell -> (type_index, team) of the cell's pieces, bottom first."""
+    turn_number, hands, pieces = board.snapshot()
+    result = {}
+    for type_index, team, cell in pieces:
+        result.setdefault(cell, []).append((type_index, team))
+    return turn_number, hands, {cell: tuple(stack) for cell, stack in result.items()}
+
+
+def test_position_key_matches_recomputation():
+    for seed in range(10):
+        for board in random_positions(seed):
+            turn_number, _, pieces = stacks(board)
+            key = SIDE_KEY if turn_number % 2 else 0
+            for cell, stack in pieces.items():
+                for height, (type_index, team) in enumerate(stack):
+                    key ^= piece_key(type_index, team, cell, height)
+            assert board.position_key() == key
+            assert Board.from_snapshot(board.snapshot()).position_key() == key
+
+
+def flood_fill_connected(cells, removed):
+    remaining = set(cells) - {removed}
+    if not remaining:
+        return True
+    start = next(iter(remaining))
+    seen = {start}
+    stack = [start]
+    while stack:
+        cell = stack.pop()
+        for offset in NEIGHBOR_OFFSETS:
+            neighbor = cell + offset
+            if neighbor in remaining and neighbor not in seen:
+                seen.add(neighbor)
+                stack.append(neighbor)
+    return seen == remaining
+
+
+def test_articulation_points_match_flood_fill():
+    for seed in range(10):
+        for board in random_positions(seed):
+            for cell, piece in board._cells.items():
+                # a stacked piece leaves the cell occupied
+                expected = piece.get_height() > 0 or flood_fill_connected(board._cells, cell)
+                assert board.can_leave(cell) == expected
+
+
+def test_deploy_cells_match_rescan():
+    for seed in range(10):
+        for board in random_positions(seed):
+            if board._turn_number < 2:
+                continue
+            cells = board._cells
+            touching = [set(), set()]
+            for cell, piece in cells.items():
+                for offset in NEIGHBOR_OFFSETS:
+                    if cell + offset not in cells:
+                        touching[piece.get_team()].add(cell + offset)
+            for team in range(2):
+                assert board.deploy_cells(team) == touching[team] - touching[1 - team]
+
+
+def test_make_unmake_round_trip():
+    for seed in range(10):
+        board = new_board()
+        history = []
+        for board in random_positions(seed):
+            history.append((stacks(board), board.position_key(), board.deploy_cells(0), board.deploy_cells(1)))
+        history.pop()
+        while history:
+            board.unmake_move()
+            assert (stacks(board), board.position_key(), board.deploy_cells(0), board.deploy_cells(1)) == history.pop()
+
+
+def test_iter_stages_matches_generate_moves():
+    for seed in range(10):
+        for board in random_positions(seed):
+            staged = [move for stage in board.iter_stages() for move in stage]
+            assert len(staged) == len(set(staged))
+            assert set(staged) == set(board.generate_moves())
+
+
+if __name__ == "__main__":
     #test_hive_broken()
     # test_ant_movement()
     # test_beetle_movement()
-    board = Board(lambda x: x)
+    board = new_board()
     loc1 = Location(0, 0)
     queen1 = Queen(loc1, 0)
     loc7 = Location(1, 1)
@@ -168,8 +288,6 @@ try:
     # Check possible moves
     #queen2.getPossibleMoves(board)
     # queen1.getPossibleMoves(board)
-    print(get_moves_for_team(board))
-    
-except (ValueError, KeyError) as e:
-    print(e)
+    print(get_moves_and_deploys(board))
+
 
@@ -0,0 +1,209 @@
+import random
+import time
+
+from utils.board import Board
+from AI.state_tree import StateTree
+from AI.state_tree_node import ROOT
+from AI.algorithms import apply_alphabeta
+from AI.parallel import parallel_root_search
+from AI.smp import SharedTranspositionTable, lazy_smp_search
+from AI.mcts import MCTS, UCT, PUCT
+from AI.parallel_mcts import root_parallel_mcts, tree_parallel_mcts
+from AI.ponder import Ponderer, PREDICTION_DEPTH
+from UI.constants import AI_MODE_SELECTIVE, PLAYER_DIFFICULTY_EASY
+
+# seeds of the random openings whose depth 3 trees stay small
+SEEDS = (2, 3)
+
+
+def new_board(seed, plies=12):
+    rnd = random.Random(seed)
+    board = Board(lambda team: None, lambda *args: None)
+    for _ in range(plies):
+        board.make_move(rnd.choice(board.generate_moves()))
+    return board
+
+
+def minimax(board, evaluate, depth, max_min):
+    """Plain minimax over every move, no pruning and no table."""
+    moves = board.generate_moves() if depth else []
+    if not moves:
+        return evaluate()
+    scores = []
+    for move in moves:
+        board.make_move(move)
+        scores.append(minimax(board, evaluate, depth - 1, not max_min))
+        board.unmake_move()
+    return max(scores) if max_min else min(scores)
+
+
+# (seed, depth) -> minimax score of the seed's board
+_exact_scores = {}
+
+
+def exact_score(seed, depth):
+    if (seed, depth) not in _exact_scores:
+        board = new_board(seed)
+        _exact_scores[seed, depth] = minimax(board, StateTree(board, 1).evaluate_board, depth, board._turn_number % 2 == 0)
+    return _exact_scores[seed, depth]
+
+
+def board_state(board):
+    """The position independent of the order the board keeps its pieces in."""
+    turn_number, hands, pieces = board.snapshot()
+    return turn_number, hands, sorted(pieces), board.position_key()
+
+
+def test_default_searcher_matches_plain_alphabeta():
+    for seed in SEEDS:
+        board = new_board(seed)
+        max_min = board._turn_number % 2 == 0
+        tree = StateTree(board, 3)
+        tree.build_tree()
+        expected = apply_alphabeta(3, max_min, tree.nodes, ROOT)
+        score, move = StateTree(board, 1).searcher.search(3, max_min)
+        assert score == expected
+        assert board.is_legal(move)
+
+
+def test_selective_mode_turns_reductions_on_and_keeps_the_board():
+    board = new_board(SEEDS[0])
+    state = board_state(board)
+    tree = StateTree(board, 3)
+    move = tree.get_best_move(AI_MODE_SELECTIVE, board._turn_number % 2 == 0)
+    assert tree.searcher.lmr and tree.searcher.null_move and tree.searcher.pvs
+    assert board_state(board) == state
+    assert board.is_legal(move)
+
+
+def test_search_matches_minimax():
+    for seed in SEEDS:
+        for depth in (2, 3):
+            board = new_board(seed)
+            state = board_state(board)
+            score, move = StateTree(board, 1).searcher.search(depth, board._turn_number % 2 == 0)
+            assert score == exact_score(seed, depth)
+            assert board_state(board) == state
+            assert board.is_legal(move)
+
+
+def test_iterative_search_matches_minimax_at_its_last_depth():
+    for seed in SEEDS:
+        board = new_board(seed)
+        state = board_state(board)
+        searcher = StateTree(board, 1).searcher
+        score, move = searcher.iterative_search(60, board._turn_number % 2 == 0, max_depth=3)
+        assert searcher.depth_reached == 3
+        assert score == exact_score(seed, 3)
+        assert board_state(board) == state
+        assert board.is_legal(move)
+
+
+def test_iterative_search_out_of_time_still_has_a_move():
+    board = new_board(SEEDS[0])
+    searcher = StateTree(board, 1).searcher
+    _, move = searcher.iterative_search(0, board._turn_number % 2 == 0)
+    assert searcher.depth_reached == 1
+    assert board.is_legal(move)
+
+
+def test_learned_move_order_keeps_the_score():
+    for seed in SEEDS:
+        board = new_board(seed)
+        max_min = board._turn_number % 2 == 0
+        searcher = StateTree(board, 1).searcher
+        searcher.search(2, max_min)
+        assert searcher.history
+        # the first search orders the second through its history, not its table
+        searcher.table.clear()
+        score, move = searcher.search(3, max_min)
+        assert score == exact_score(seed, 3)
+        assert board.is_legal(move)
+
+
+def test_principal_variation_search_matches_alphabeta():
+    for seed in SEEDS:
+        for depth in (2, 3):
+            board = new_board(seed)
+            max_min = board._turn_number % 2 == 0
+            searcher = StateTree(board, 1).searcher
+            searcher.pvs = True
+            score, move = searcher.search(depth, max_min)
+            assert score == StateTree(board, 1).searcher.search(depth, max_min)[0] == exact_score(seed, depth)
+            assert board.is_legal(move)
+
+
+def test_parallel_root_search_matches_minimax():
+    for seed in SEEDS:
+        board = new_board(seed)
+        state = board_state(board)
+        score, move, nodes = parallel_root_search(board, 3, board._turn_number % 2 == 0, PLAYER_DIFFICULTY_EASY, workers=2)
+        assert score == exact_score(seed, 3)
+        assert nodes > 0
+        assert board_state(board) == state
+        assert board.is_legal(move)
+
+
+def test_lazy_smp_matches_minimax_at_a_fixed_depth():
+    for seed in SEEDS:
+        board = new_board(seed)
+        state = board_state(board)
+        score, move, nodes = lazy_smp_search(board, 60, board._turn_number % 2 == 0, PLAYER_DIFFICULTY_EASY,
+                                             workers=2, memory_mb=1, max_depth=3)
+        assert score == exact_score(seed, 3)
+        assert nodes > 0
+        assert board_state(board) == state
+        assert board.is_legal(move)
+
+
+def test_mcts_plays_a_legal_move_and_restores_the_board():
+    for selection in (UCT, PUCT):
+        board = new_board(SEEDS[0])
+        state = board_state(board)
+        mcts = MCTS(board, StateTree(board, 1).evaluate_board, selection=selection, seed=1)
+        move = mcts.search(max_playouts=300)
+        first = mcts.first_child[0]
+        # every playout passes the root and one of its children
+        assert mcts.visits[0] == mcts.playouts == 300
+        assert sum(mcts.visits[child] for child in range(first, first + mcts.child_count[0])) == 300
+        assert -1.0 <= mcts.root_value() <= 1.0
+        assert board_state(board) == state
+        assert board.is_legal(move)
+
+
+def test_parallel_mcts_plays_a_legal_move_and_keeps_the_board():
+    for search in (root_parallel_mcts, tree_parallel_mcts):
+        board = new_board(SEEDS[0])
+        state = board_state(board)
+        move, value, stats = search(board, 0.5, PLAYER_DIFFICULTY_EASY, workers=2)
+        assert stats["workers"] == 2 and stats["playouts"] > 0
+        assert -1.0 <= value <= 1.0
+        assert board_state(board) == state
+        assert board.is_legal(move)
+
+
+def test_ponderer_answers_the_predicted_move_only():
+    board = new_board(SEEDS[0])
+    state = board_state(board)
+    # the side to move is the opponent, the AI just moved
+    max_min = board._turn_number % 2 == 1
+    predicted = StateTree(board, 1).searcher.search(PREDICTION_DEPTH, not max_min)[1]
+    other = next(move for move in board.generate_moves() if move != predicted)
+    table = SharedTranspositionTable(1)
+    try:
+        ponderer = Ponderer(table, PLAYER_DIFFICULTY_EASY)
+        ponderer.start(board, max_min)
+        time.sleep(1)
+        result = ponderer.stop(predicted)
+        assert result is not None and result.predicted == predicted
+        board.make_move(predicted)
+        assert board.is_legal(result.move)
+        board.unmake_move()
+
+        ponderer.start(board, max_min)
+        assert ponderer.stop(other) is None
+        assert (ponderer.hits, ponderer.misses) == (1, 1)
+        assert not ponderer.is_pondering()
+        assert board_state(board) == state
+    finally:
+        table.unlink()
@@ -0,0 +1,165 @@
+import random
+
+from utils.board import Board
+from AI.state_tree import StateTree
+from AI.state_tree_node import NodeStore, ROOT, NO_NODE, EVALUATED
+from AI.algorithms import apply_alphabeta, apply_lazy_alphabeta
+from AI.transposition import TranspositionTable, EXACT
+from UI.constants import AI_MODE_MINMAX, AI_MODE_ALPHA_BETA, PLAYER_DIFFICULTY_EASY, PLAYER_DIFFICULTY_MEDIUM
+
+
+def new_board(seed, plies=10):
+    rnd = random.Random(seed)
+    board = Board(lambda team: None, lambda *args: None)
+    for _ in range(plies):
+        board.make_move(rnd.choice(board.generate_moves()))
+    return board
+
+
+def play_turn(tree, board, rnd, mode):
+    """The tree's move and a random reply, the tree follows both."""
+    max_min = board._turn_number % 2 == 0
+    move = tree.get_best_move(mode, max_min)
+    board.make_move(move)
+    assert tree.advance(board.position_key())
+    reply = rnd.choice(board.generate_moves())
+    board.make_move(reply)
+    return tree.advance(board.position_key())
+
+
+def assert_consistent(tree):
+    """Every node is reached once from the root, below its own parent and with the key of its position."""
+    nodes = tree.nodes
+    board = tree._board_state
+    assert nodes.parent[ROOT] == NO_NODE
+    assert nodes.key[ROOT] == board.position_key()
+    seen = {ROOT}
+    stack = [(ROOT, child) for child in nodes.children(ROOT)]
+    path = []
+    while stack:
+        parent, node = stack.pop()
+        # back up the board to the parent's position
+        while path and path[-1] != parent:
+            path.pop()
+            board.unmake_move()
+        assert node not in seen
+        seen.add(node)
+        assert nodes.parent[node] == parent
+        assert nodes.depth[node] == nodes.depth[parent] + 1
+        board.make_move(nodes.move[node])
+        path.append(node)
+        # keys are only filled in once the search reached the node
+        assert nodes.key[node] in (0, board.position_key())
+        stack.extend((node, child) for child in nodes.children(node))
+    for _ in path:
+        board.unmake_move()
+    assert seen == set(range(len(nodes)))
+
+
+def test_table_keeps_shallow_entries_from_cutting_deeper_searches():
+    table = TranspositionTable(1)
+    table.store(1234, 2, 50.0, EXACT, None)
+    assert table.probe(1234, 2, float('-inf'), float('inf'))[0] == 50.0
+    assert table.probe(1234, 3, float('-inf'), float('inf'))[0] is None
+
+
+def test_minmax_stores_the_depth_searched_after_reusing_the_tree():
+    for seed in range(3):
+        rnd = random.Random(seed)
+        board = new_board(seed)
+        tree = StateTree(board, 2)
+        tree.build_tree()
+        if not play_turn(tree, board, rnd, AI_MODE_MINMAX):
+            continue
+        # the root is two plies down the tree now
+        tree._depth += 2
+        tree.add_level()
+        assert tree.nodes.depth[ROOT] == 2
+        tree.get_best_move(AI_MODE_MINMAX, board._turn_number % 2 == 0)
+        entry = tree.table.get(board.position_key())
+        assert entry is not None and entry[0] == tree._depth - tree.nodes.depth[ROOT]
+
+
+def test_lazy_alphabeta_stores_the_depth_searched_after_reusing_the_tree():
+    for seed in range(3):
+        rnd = random.Random(seed)
+        board = new_board(seed)
+        tree = StateTree(board, 2)
+        if not play_turn(tree, board, rnd, AI_MODE_ALPHA_BETA):
+            continue
+        tree._depth += 2
+        assert tree.nodes.depth[ROOT] == 2
+        tree.get_best_move(AI_MODE_ALPHA_BETA, board._turn_number % 2 == 0)
+        entry = tree.table.get(board.position_key())
+        assert entry is not None and entry[0] == tree._depth - tree.nodes.depth[ROOT]
+
+
+def test_cached_evaluations_match_a_fresh_evaluation():
+    for difficulty in (PLAYER_DIFFICULTY_EASY, PLAYER_DIFFICULTY_MEDIUM):
+        for seed in range(3):
+            rnd = random.Random(seed)
+            board = new_board(seed)
+            tree = StateTree(board, 1, difficulty)
+            plies = 0
+            for _ in range(150):
+                moves = board.generate_moves()
+                if plies and (rnd.random() < 0.4 or not moves or board.check_win_condition_bool()):
+                    board.unmake_move()
+                    plies -= 1
+                elif moves and not board.check_win_condition_bool():
+                    board.make_move(rnd.choice(moves))
+                    plies += 1
+                if board._turn_number < 8:
+                    continue
+                fresh = StateTree(Board.from_snapshot(board.snapshot()), 1, difficulty)
+                assert tree.evaluate_board() == fresh.evaluate_board()
+            assert tree.cache.hits.get(difficulty, 0) > 0
+
+
+def test_advance_and_trim_keep_the_tree_consistent():
+    for seed in range(3):
+        rnd = random.Random(seed)
+        board = new_board(seed)
+        tree = StateTree(board, 2)
+        tree.build_tree()
+        if not play_turn(tree, board, rnd, AI_MODE_MINMAX):
+            continue
+        tree._depth += 2
+        tree.add_level()
+        assert_consistent(tree)
+        max_nodes = len(tree.nodes) // 4
+        assert tree.trim(max_nodes) == len(tree.nodes) <= max_nodes
+        assert_consistent(tree)
+
+
+def test_node_store_links_children_in_order():
+    store = NodeStore(7)
+    assert list(store.add_children(ROOT, [11, 12, 13])) == [1, 2, 3]
+    first = store.add_child(2, 21)
+    store.add_child(2, 22, first)
+    store.add_children(ROOT, [14])
+    assert [store.move[child] for child in store.children(ROOT)] == [11, 12, 13, 14]
+    assert [store.move[child] for child in store.children(2)] == [21, 22]
+    assert all(store.parent[child] == 2 and store.depth[child] == 2 for child in store.children(2))
+
+    subtree = store.subtree(2)
+    assert subtree.parent[ROOT] == NO_NODE and subtree.depth[ROOT] == 1
+    assert [subtree.move[child] for child in subtree.children(ROOT)] == [21, 22]
+    assert all(subtree.parent[child] == ROOT for child in subtree.children(ROOT))
+
+    store.cut(2)
+    assert not store.has_children(2) and store.expansion[2] == EVALUATED
+    assert len(store.subtree(ROOT)) == 5
+
+
+def test_lazy_alphabeta_matches_alphabeta_on_the_whole_tree():
+    for seed in (2, 3):
+        board = new_board(seed, plies=12)
+        max_min = board._turn_number % 2 == 0
+        full = StateTree(board, 3)
+        full.build_tree()
+        lazy = StateTree(board, 3)
+        assert apply_lazy_alphabeta(3, max_min, lazy, ROOT) == apply_alphabeta(3, max_min, full.nodes, ROOT)
+        # the cutoffs left part of the tree ungenerated
+        assert len(lazy.nodes) < len(full.nodes)
+        assert_consistent(lazy)
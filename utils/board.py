@@ -1,6 +1,21 @@
 from .location import Location
+from .cell import NEIGHBOR_OFFSETS, GATE_OFFSETS, DISTANCE_BUCKETS, cell_of, location_of, pack
+from .zobrist import SIDE_KEY, object_key
 from .pieces.game_object import GameObject
-from .pieces import Queen, Beetle, Ant, Spider, Grasshopper
+from .pieces import Queen, Beetle, Ant, Spider, Grasshopper, PIECE_TYPES
+from .moves import move_list, encode_deploy, encode_move, decode_move, is_deploy, move_type, move_from, move_to
+
+# stages of Board.iter_moves
+STAGE_ATTACK = "attack"      # queen/beetle/grasshopper moves adding a neighbour to the enemy queen
+STAGE_ESCAPE = "escape"      # queen/beetle/grasshopper moves freeing our own queen
+STAGE_QUIET = "quiet"        # every other queen/beetle/grasshopper move
+STAGE_DEPLOY = "deploy"      # pieces from the hand
+STAGE_SLIDING = "sliding"    # ant and spider moves, the expensive ones
+DEFAULT_STAGE_ORDER = (STAGE_ATTACK, STAGE_ESCAPE, STAGE_QUIET, STAGE_DEPLOY, STAGE_SLIDING)
+STEPPING_STAGES = (STAGE_ATTACK, STAGE_ESCAPE, STAGE_QUIET)
+
+def _ignore(*args):
+    pass
 
 class QueenNotPlayedException(Exception):
     def __init__(self, message="The queen must be played within the first four turns."):
@@ -13,12 +28,64 @@ class Board:
         self._queen_played = [False, False]
         self._queens_reference = [None, None]
         self._objects = {}
+        # packed cell -> top piece, mirrors _objects for fast lookups
+        self._cells = {}
+        # zobrist hash of the pieces on the board, see position_key
+        self._hash = 0
+        # cells whose piece can't leave without splitting the hive, computed
+        # lazily once per position
+        self._articulation_points = None
+        # empty cell -> cells it can slide to, filled lazily once per position
+        self._slide_graph = {}
+        # per team, number of the team's top pieces touching every cell next
+        # to the hive and the empty cells where the team can deploy
+        self._touching = [{}, {}]
+        self._deploy_cells = [set(), set()]
+        # moves played by make_move and the objects they took out of the hands
+        self._undo_stack = []
+        self._piece_pool = [{piece_type: [] for piece_type in PIECE_TYPES} for _ in range(2)]
+        # told about every change of a cell's top piece, see add_listener
+        self._listeners = []
         self._turn_number = 0
         self.win_callback = win_callback
         self.alert_callback = alert_callback
         self._hands = {}
         self.initiate_game()
 
+    def snapshot(self):
+        """
+        Picklable description of the position, for rebuilding the board in
+        another process with from_snapshot (the callbacks can't be pickled).
+        Returns:
+            tuple: (turn number, hands as {type_index: count} per team,
+            (type_index, team, cell) of every piece with stacks bottom first).
+        """
+        pieces = []
+        for top in self._cells.values():
+            stack = [top]
+            while isinstance(stack[-1], Beetle) and stack[-1].on_top_off:
+                stack.append(stack[-1].on_top_off[-1])
+            for game_object in reversed(stack):
+                pieces.append((game_object.type_index, game_object.get_team(), game_object.get_cell()))
+        hands = tuple({piece_type.type_index: count for piece_type, count in self._hands[team].items()} for team in range(2))
+        return self._turn_number, hands, tuple(pieces)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, win_callback=_ignore, alert_callback=_ignore):
+        """Builds a board in the position described by snapshot()."""
+        turn_number, hands, pieces = snapshot
+        board = cls(win_callback, alert_callback)
+        for team in range(2):
+            board._hands[team] = {PIECE_TYPES[type_index]: count for type_index, count in hands[team].items()}
+        for type_index, team, cell in pieces:
+            game_object = PIECE_TYPES[type_index](location_of(cell), team)
+            if isinstance(game_object, Queen):
+                board._queen_played[team] = True
+                board._queens_reference[team] = game_object
+            board._put(game_object, cell)
+        board._turn_number = turn_number
+        return board
+
     def get_board_representation(self):
         
         board_representation = [None] * 23
@@ -38,6 +105,15 @@ class Board:
         board_representation[22] = self._turn_number % 2
         return board_representation
 
+    def position_key(self):
+        """
+        64-bit Zobrist key of the current position, covering every piece
+        type, team, cell and stack height plus the side to move.
+        """
+        if self._turn_number % 2:
+            return self._hash ^ SIDE_KEY
+        return self._hash
+
     def turn(self):
         """
         Determines whose turn it is to play.
@@ -59,38 +135,153 @@ class Board:
         
 
     def get_moves_and_deploys(self):
-        combined_results = []
+        return [decode_move(move) for move in self.generate_moves()]
+
+    def generate_moves(self):
+        """
+        Generates every legal move of the side to play.
+        Returns:
+            array: encoded moves (see utils.moves), piece moves first then deploys.
+        """
+        moves = move_list()
 
         if self.check_win_condition_bool():
-            return combined_results
+            return moves
 
         team_number = 0 if self.turn() else 1
         available_pieces = self._hands[team_number]
 
-        deploy_locations = self.getPossibleDeployLocations(team_number)
-        flag=1
+        deploy_cells = self.deploy_cells(team_number)
 
         if (self._turn_number == 6 and team_number == 0) or (self._turn_number == 7 and team_number == 1):
             if available_pieces.get(Queen, 0) > 0:  # If Queen is still in hand
-                flag=0
-                for location in deploy_locations:
-                    combined_results.append(('Queen', location))
-        
-        if(flag):
-            team_pieces = self.filter_team_pieces()
+                for cell in deploy_cells:
+                    moves.append(encode_deploy(Queen.type_index, cell))
+                return moves
+
+        for cell, piece in self._cells.items():
+            if piece.get_team() == team_number:
+                type_index = piece.type_index
+                for destination in piece.get_next_possible_cells(self):
+                    moves.append(encode_move(type_index, cell, destination))
+
+        for piece_type, count in available_pieces.items():
+            if count > 0:
+                type_index = piece_type.type_index
+                for cell in deploy_cells:
+                    moves.append(encode_deploy(type_index, cell))
+
+        return moves
 
-            for location, piece in team_pieces.items():
-                possible_destinations = piece.get_next_possible_locations(self)
+    def iter_moves(self, stage_order=DEFAULT_STAGE_ORDER):
+        """
+        Lazily generates the same moves as generate_moves, stage by stage, so
+        a search that cuts off early never pays for the later stages. The
+        board has to be back in the same position (make_move undone) every
+        time the next move is requested.
+        Args:
+            stage_order (tuple): the STAGE_* names in the order they should be
+            generated, stages left out are skipped.
+        Yields:
+            int: encoded moves (see utils.moves).
+        """
+        for moves in self.iter_stages(stage_order):
+            yield from moves
+
+    def iter_stages(self, stage_order=DEFAULT_STAGE_ORDER):
+        """
+        Same as iter_moves but yields the moves of a whole stage at once, for
+        callers that reorder the moves inside a stage.
+        Yields:
+            list: encoded moves of the next stage (may be empty).
+        """
+        if self.check_win_condition_bool():
+            return
+
+        team_number = 0 if self.turn() else 1
+        available_pieces = self._hands[team_number]
 
-                for destination in possible_destinations:
-                    combined_results.append((location, destination))
+        if (self._turn_number == 6 and team_number == 0) or (self._turn_number == 7 and team_number == 1):
+            if available_pieces.get(Queen, 0) > 0:  # If Queen is still in hand
+                yield [encode_deploy(Queen.type_index, cell) for cell in self.deploy_cells(team_number)]
+                return
+
+        enemy_queen = self._queens_reference[1 - team_number]
+        own_queen = self._queens_reference[team_number]
+        attack_cells = set()
+        if enemy_queen is not None:
+            attack_cells.add(enemy_queen.get_cell())
+            attack_cells.update(enemy_queen.get_cell() + offset for offset in NEIGHBOR_OFFSETS)
+        escape_cells = set()
+        if own_queen is not None:
+            escape_cells.update(own_queen.get_cell() + offset for offset in NEIGHBOR_OFFSETS)
+
+        # the board changes between yields, so take the pieces up front
+        pieces = [piece for piece in self._cells.values() if piece.get_team() == team_number]
+        stepping_moves = None
+
+        for stage in stage_order:
+            if stage in STEPPING_STAGES:
+                if stepping_moves is None:
+                    stepping_moves = {STAGE_ATTACK: [], STAGE_ESCAPE: [], STAGE_QUIET: []}
+                    for piece in pieces:
+                        if isinstance(piece, (Ant, Spider)):
+                            continue
+                        cell = piece.get_cell()
+                        type_index = piece.type_index
+                        for destination in piece.get_next_possible_cells(self):
+                            if destination in attack_cells and cell not in attack_cells:
+                                move_stage = STAGE_ATTACK
+                            elif piece is own_queen or (cell in escape_cells and destination not in escape_cells):
+                                move_stage = STAGE_ESCAPE
+                            else:
+                                move_stage = STAGE_QUIET
+                            stepping_moves[move_stage].append(encode_move(type_index, cell, destination))
+                yield stepping_moves[stage]
+
+            elif stage == STAGE_DEPLOY:
+                moves = []
+                deploy_cells = self.deploy_cells(team_number)
+                for piece_type, count in list(available_pieces.items()):
+                    if count > 0:
+                        type_index = piece_type.type_index
+                        for cell in deploy_cells:
+                            moves.append(encode_deploy(type_index, cell))
+                yield moves
+
+            elif stage == STAGE_SLIDING:
+                moves = []
+                later = []
+                for piece in pieces:
+                    if not isinstance(piece, (Ant, Spider)):
+                        continue
+                    cell = piece.get_cell()
+                    type_index = piece.type_index
+                    # the ones reaching the enemy queen first
+                    for destination in piece.get_next_possible_cells(self):
+                        if destination in attack_cells:
+                            moves.append(encode_move(type_index, cell, destination))
+                        else:
+                            later.append(encode_move(type_index, cell, destination))
+                moves.extend(later)
+                yield moves
+
+    def is_legal(self, move):
+        """
+        Whether the encoded move is one of the moves generate_moves returns,
+        without generating all of them.
+        """
+        if not self.is_playable(move) or self.check_win_condition_bool():
+            return False
 
-            for piece_type, count in available_pieces.items():
-                if count > 0:
-                    for location in deploy_locations:
-                        combined_results.append((piece_type.__name__, location))
+        team_number = self._turn_number % 2
+        if (self._turn_number == 6 and team_number == 0) or (self._turn_number == 7 and team_number == 1):
+            if self._hands[team_number].get(Queen, 0) > 0 and not (is_deploy(move) and move_type(move) == Queen.type_index):
+                return False
 
-        return combined_results
+        if is_deploy(move):
+            return move_to(move) in self.deploy_cells(team_number)
+        return move_to(move) in self._cells[move_from(move)].get_next_possible_cells(self)
 
     def initiate_game(self):
        
@@ -131,7 +322,7 @@ class Board:
                 self._queen_played[current_team] = True
                 self._queens_reference[current_team] = game_object
 
-            self._objects[game_object.get_location()] = game_object
+            self._put(game_object, game_object.get_cell())
             self._hands[game_object.get_team()][game_object.__class__] -= 1
             self._turn_number += 1
 
@@ -148,45 +339,129 @@ class Board:
 
 
     def check_win_condition(self):
-        d = [(2, 0), (-2, 0), (1, 1), (-1, 1), (1, -1), (-1, -1)]
-
-        for dx, dy in d:
-            test_location = self._queens_reference[0].get_location()
-            if not self.get_object(test_location.create_from_self(dx, dy)):
-                break
-        else:
+        if self.isSurroundedBySix(self._queens_reference[0].get_location()):
             self.win_callback(1)
             return
 
-        for dx, dy in d:
-            test_location = self._queens_reference[1].get_location()
-            if not self.get_object(test_location.create_from_self(dx, dy)):
-                break
-        else:
+        if self.isSurroundedBySix(self._queens_reference[1].get_location()):
             self.win_callback(0)
             return
 
     def check_win_condition_bool(self):
-        d = [(2, 0), (-2, 0), (1, 1), (-1, 1), (1, -1), (-1, -1)]
+        cells = self._cells
 
-        if self._queens_reference[0]:
-            for dx, dy in d:
-                test_location = self._queens_reference[0].get_location()
-                if not self.get_object(test_location.create_from_self(dx, dy)):
-                    break
-            else:
-                return -1
+        for queen, result in zip(self._queens_reference, (-1, 1)):
+            if queen:
+                queen_cell = queen.get_cell()
+                for offset in NEIGHBOR_OFFSETS:
+                    if queen_cell + offset not in cells:
+                        break
+                else:
+                    return result
 
-        if self._queens_reference[1]:
-            for dx, dy in d:
-                test_location = self._queens_reference[1].get_location()
-                if not self.get_object(test_location.create_from_self(dx, dy)):
-                    break
-            else:
-                return 1
-        
         return 0
 
+    def queen_cell(self, team):
+        """Cell of the team's queen, None while it is still in the hand."""
+        queen = self._queens_reference[team]
+        return queen.get_cell() if queen else None
+
+    def queen_neighbors(self, team):
+        """Number of occupied cells around the team's queen (0 if not played)."""
+        queen = self._queens_reference[team]
+        if not queen:
+            return 0
+        cells = self._cells
+        queen_cell = queen.get_cell()
+        return sum(1 for offset in NEIGHBOR_OFFSETS if queen_cell + offset in cells)
+
+    def mobility(self, team, target=None):
+        """
+        Counts the moves of the team's pieces on the board without building
+        the move lists.
+        Args:
+            team (int): the team whose pieces are counted.
+            target (int): cell the histograms measure the distance to, the
+            enemy queen's cell by default (no histograms while it is in the
+            hand).
+        Returns:
+            tuple: (cells reachable per type_index, histograms per type_index
+            counting those cells by their distance_bucket from the target).
+        """
+        counts = [0] * len(PIECE_TYPES)
+        histograms = [[0] * DISTANCE_BUCKETS for _ in PIECE_TYPES]
+        if target is None:
+            target = self.queen_cell(1 - team)
+        # checked once here instead of once per piece, only grasshoppers
+        # move before their queen is played
+        queen_played = bool(self._queens_reference[team])
+        for cell, piece in self._cells.items():
+            if piece.get_team() != team:
+                continue
+            if not queen_played and piece.__class__ is not Grasshopper:
+                continue
+            # a pinned piece has no moves, nothing to generate
+            if not self.can_leave(cell):
+                continue
+            type_index = piece.type_index
+            histogram = histograms[type_index] if target is not None else None
+            counts[type_index] += piece.count_next_possible_cells(self, target, histogram)
+        return counts, histograms
+
+    def _update_frontier(self, cell, old_top, new_top):
+        """
+        Updates the touching counters after the top piece of a cell changed,
+        only the top piece's team counts for a stack. The deploy cells
+        around it have to be refreshed after the board is updated.
+        """
+        if old_top is not None and new_top is not None and old_top.get_team() == new_top.get_team():
+            return
+
+        touching = self._touching
+        for offset in NEIGHBOR_OFFSETS:
+            neighbor = cell + offset
+            if old_top is not None:
+                counts = touching[old_top.get_team()]
+                count = counts[neighbor] - 1
+                if count:
+                    counts[neighbor] = count
+                else:
+                    del counts[neighbor]
+            if new_top is not None:
+                counts = touching[new_top.get_team()]
+                counts[neighbor] = counts.get(neighbor, 0) + 1
+
+    def _refresh_deploy_cells(self, cell):
+        # free positions touching a friendly object and no enemy object
+        cells = self._cells
+        touching_white, touching_black = self._touching
+        deploy_white, deploy_black = self._deploy_cells
+        for offset in (0,) + NEIGHBOR_OFFSETS:
+            search_cell = cell + offset
+            empty = search_cell not in cells
+            if empty and search_cell in touching_white and search_cell not in touching_black:
+                deploy_white.add(search_cell)
+            else:
+                deploy_white.discard(search_cell)
+            if empty and search_cell in touching_black and search_cell not in touching_white:
+                deploy_black.add(search_cell)
+            else:
+                deploy_black.discard(search_cell)
+
+    def add_listener(self, listener):
+        """
+        Registers an object whose top_changed(cell, old_top, new_top) is
+        called after the top piece of a cell changes (a piece put, lifted or
+        climbed on), so it can keep its own counters up to date through
+        make_move/unmake_move as well as moves played from the UI.
+        """
+        self._listeners.append(listener)
+
+    def _position_changed(self):
+        # drop everything cached for the previous position
+        self._articulation_points = None
+        self._slide_graph = {}
+
     def get_object(self, location):
         """
         Get the game object at a specific position.
@@ -194,7 +469,16 @@ class Board:
         Returns:
             object: The game object at the given position, or None if empty.
         """
-        return self._objects.get((location), None)
+        return self._cells.get(cell_of(location), None)
+
+    def get_object_at(self, cell):
+        """
+        Get the game object at a packed cell (see utils.cell).
+
+        Returns:
+            object: The game object at the given cell, or None if empty.
+        """
+        return self._cells.get(cell, None)
 
     def remove_object(self, location):
         """
@@ -216,7 +500,7 @@ class Board:
             self._queens_reference[game_object._team] = None
 
         self._hands[game_object.get_team()][game_object.__class__] += 1 # increase chosen object by one
-        del self._objects[(location)]
+        self._lift(game_object)
 
     def move_object(self, oldLocation, newLocation, ai = False):
         """
@@ -227,19 +511,9 @@ class Board:
         """
         if (oldLocation) not in self._objects:
             raise KeyError(f"No object found at position old location.")
-        object : GameObject = self._objects.pop((oldLocation))
-
-        if isinstance(object, Beetle):
-            if object.on_top_off:
-                bottom_object = object.on_top_off.pop()
-                bottom_object.set_location(oldLocation)
-                self._objects[(oldLocation)] = bottom_object
-            piece_at_location = self._objects.pop((newLocation), None)
-            if piece_at_location:
-                object.put_on_top_of(piece_at_location)
-
-        object.set_location(newLocation)
-        self._objects[(newLocation)] = object
+        object : GameObject = self._objects[(oldLocation)]
+        self._lift(object)
+        self._put(object, cell_of(newLocation))
 
         self._turn_number += 1
         if self._turn_number > 7 and not ai:
@@ -248,27 +522,121 @@ class Board:
         # print(object.__class__.__name__," was moved to ", newLocation)
         # print("Board state:", self._objects)
 
-    def check_if_hive_valid(self ,old_loc: Location, new_loc: Location):
-        removed = []
-        removed.append((old_loc, self._objects.pop((old_loc))))
-        self._recurse_pop(new_loc, removed)
+    def _lift(self, game_object):
+        """Takes an object off the top of its cell, uncovering what is below it."""
+        cell = game_object.get_cell()
+        location = game_object.get_location()
+        del self._objects[location]
+        del self._cells[cell]
+        self._hash ^= object_key(game_object)
+
+        bottom_object = None
+        if isinstance(game_object, Beetle) and game_object.on_top_off:
+            bottom_object = game_object.on_top_off.pop()
+            self._objects[location] = bottom_object
+            self._cells[cell] = bottom_object
+
+        self._update_frontier(cell, game_object, bottom_object)
+        self._refresh_deploy_cells(cell)
+        self._position_changed()
+        for listener in self._listeners:
+            listener.top_changed(cell, game_object, bottom_object)
+
+    def _put(self, game_object, cell):
+        """Puts an object on a cell, beetles climb on top of what is there."""
+        location = location_of(cell)
+        piece_at_location = None
+        if isinstance(game_object, Beetle):
+            piece_at_location = self._objects.pop(location, None)
+            if piece_at_location:
+                game_object.put_on_top_of(piece_at_location)
 
-        if self._objects.keys():
-            for location, insect in removed:
-                self._objects[(location)] = insect
-            return False
+        game_object.set_location(location)
+        self._objects[location] = game_object
+        self._cells[cell] = game_object
+        self._hash ^= object_key(game_object)
 
-        for location, insect in removed:
-            self._objects[(location)] = insect
-        return True
+        self._update_frontier(cell, piece_at_location, game_object)
+        self._refresh_deploy_cells(cell)
+        self._position_changed()
+        for listener in self._listeners:
+            listener.top_changed(cell, piece_at_location, game_object)
+
+    def make_move(self, move):
+        """
+        Plays a move from generate_moves without any validation and records
+        how to take it back with unmake_move. Deployed objects are reused
+        from the ones taken back before.
+        Args:
+            move (int): encoded move, see utils.moves.
+        """
+        destination_cell = move_to(move)
+        team = self._turn_number % 2
+
+        if is_deploy(move):
+            piece_type = PIECE_TYPES[move_type(move)]
+            pool = self._piece_pool[team][piece_type]
+            game_object = pool.pop() if pool else piece_type(location_of(destination_cell), team)
+            self._undo_stack.append((game_object, None, self._hash))
+
+            if piece_type is Queen:
+                self._queen_played[team] = True
+                self._queens_reference[team] = game_object
+            self._hands[team][piece_type] -= 1
+            self._put(game_object, destination_cell)
+        else:
+            game_object = self._cells[move_from(move)]
+            self._undo_stack.append((game_object, game_object.get_cell(), self._hash))
+            self._lift(game_object)
+            self._put(game_object, destination_cell)
+
+        self._turn_number += 1
+
+    def make_null_move(self):
+        """
+        Passes the turn without moving, for null-move pruning. Taken back by
+        unmake_move like any other move.
+        """
+        self._undo_stack.append((None, None, self._hash))
+        self._turn_number += 1
+
+    def unmake_move(self):
+        """Takes back the last move played by make_move or make_null_move."""
+        game_object, old_cell, previous_hash = self._undo_stack.pop()
+        self._turn_number -= 1
+        if game_object is None:
+            return
+        self._lift(game_object)
+
+        if old_cell is None:
+            team = game_object.get_team()
+            piece_type = game_object.__class__
+            if piece_type is Queen:
+                self._queen_played[team] = False
+                self._queens_reference[team] = None
+            self._hands[team][piece_type] += 1
+            self._piece_pool[team][piece_type].append(game_object)
+        else:
+            # a beetle goes back on top of whatever it was covering
+            self._put(game_object, old_cell)
+
+        self._hash = previous_hash
 
-    def _recurse_pop(self, loc: Location, removed):
-        for dx, dy in [(2, 0), (-2, 0), (1, 1), (-1, 1), (1, -1), (-1, -1)]:
-            new_location = Location(loc.get_x() + dx, loc.get_y() + dy)
-            insect = self._objects.pop((new_location), None)
-            if insect:
-                removed.append((new_location, insect))
-                self._recurse_pop(new_location, removed)
+    def is_playable(self, move):
+        """
+        Cheap sanity check for moves that did not come from this position's
+        generator (e.g. a transposition table entry), so make_move can't be
+        handed a piece that isn't there. It does not check the movement rules.
+        """
+        team = self._turn_number % 2
+        piece_type = PIECE_TYPES[move_type(move)]
+        if is_deploy(move):
+            return self._hands[team].get(piece_type, 0) > 0 and move_to(move) not in self._cells
+        game_object = self._cells.get(move_from(move))
+        return game_object is not None and game_object.get_team() == team and game_object.__class__ is piece_type
+
+    def check_if_hive_valid(self ,old_loc: Location, new_loc: Location):
+        return self.is_hive_connected(cell_of(old_loc), cell_of(new_loc))
 
     def __repr__(self):
         """
@@ -285,52 +653,167 @@ class Board:
         Returns:
             bool: True if the hive is still connected, False otherwise.
         """
-        
-        newBoard = dict(self._objects)
-        del newBoard[oldLoc]
-        visited = []
-
-        # test neighbours
-        def checkHive(loc: Location, prev:Location):
-            # if(loc in visited):
-            #     return
-            # del newBoard[(loc)]
-            visited.append(loc)
-            curr_x = loc.get_x()
-            curr_y = loc.get_y()
-            d = [(2,0),(-2,0),(1,1),(-1,1),(1,-1),(-1,-1)]
-            for (dx,dy) in d:
-                current_search_loc = Location(curr_x + dx, curr_y + dy)
-                if((curr_x + dx, curr_y + dy) == (prev.get_x(), prev.get_y()) or current_search_loc in visited):
-                    continue
-                if newBoard.get((current_search_loc),None) is not None:
-                    checkHive(current_search_loc, loc)
-            
-            if(loc in newBoard):
-                del newBoard[(loc)]
+        if newLoc is None:
+            return self.can_leave(cell_of(oldLoc))
+        return self.keeps_hive_connected(cell_of(oldLoc), cell_of(newLoc))
 
-        
-        # Check if the ibject can leave its initial position
-        if(newLoc is None):
-            curr_x = oldLoc.get_x()
-            curr_y = oldLoc.get_y()
-            d = [(2,0),(-2,0),(1,1),(-1,1),(1,-1),(-1,-1)]
-            for (dx,dy) in d:
-                # search hive starting from first sibling
-                curr: Location = Location(curr_x+dx, curr_y+dy)
-                if newBoard.get((curr),None) is not None:
-                    checkHive(curr,curr)
-                    if(len(newBoard) == 0):
-                        return True
-                    else:
-                        return False
-        
-        checkHive(newLoc,newLoc)
-        if(len(newBoard) == 0):
-            return True
-        else:
+    def articulation_points(self):
+        """
+        Cells whose object can't leave without splitting the hive, unless
+        it is stacked on others. Computed once per position, a new position
+        gets a new set instead of changing this one.
+        """
+        if self._articulation_points is None:
+            self._articulation_points = self._find_articulation_points()
+        return self._articulation_points
+
+    def can_leave(self, cell):
+        """
+        Checks if the object at a cell can leave it without splitting the
+        hive, using the articulation points of the current position.
+        """
+        if self._articulation_points is None:
+            self._articulation_points = self._find_articulation_points()
+        return cell not in self._articulation_points or self._cells[cell].get_height() > 0
+
+    def keeps_hive_connected(self, old_cell, new_cell):
+        """
+        Checks if the hive is still connected after moving the object at
+        old_cell to new_cell in O(1). Unlike is_hive_connected the object has
+        to be able to leave old_cell first, the hive can't be split during
+        the move even if the destination joins it back.
+        """
+        if not self.can_leave(old_cell):
             return False
 
+        cells = self._cells
+        if new_cell in cells or len(cells) == 1:
+            return True
+        # the rest of the hive is connected so the object only has to touch it
+        stacked = cells[old_cell].get_height() > 0
+        for offset in NEIGHBOR_OFFSETS:
+            neighbor = new_cell + offset
+            if neighbor in cells and (neighbor != old_cell or stacked):
+                return True
+        return False
+
+    def perimeter(self):
+        """Returns the set of empty cells touching the hive."""
+        touching_white, touching_black = self._touching
+        return {cell for cell in (touching_white.keys() | touching_black.keys()) if cell not in self._cells}
+
+    def slide_neighbors(self, cell, removed=None):
+        """
+        Cells an object on an empty cell can slide to in one step: the gate
+        to the cell is open and the object keeps touching the hive while
+        sliding (exactly one of the two cells beside the path is occupied).
+        Args:
+            cell (int): the cell the object slides from.
+            removed (int): cell of the moving object, it is treated as empty
+            since it left its position.
+        Returns:
+            tuple: the cells reachable in one slide.
+        """
+        # the slides next to the moving object differ from the cached ones
+        if removed is not None and (cell == removed or cell - removed in GATE_OFFSETS):
+            return self._find_slides(cell, removed)
+
+        slides = self._slide_graph.get(cell)
+        if slides is None:
+            slides = self._slide_graph[cell] = self._find_slides(cell, None)
+        return slides
+
+    def _find_slides(self, cell, removed):
+        cells = self._cells
+        slides = []
+        for offset in NEIGHBOR_OFFSETS:
+            target = cell + offset
+            if target in cells and target != removed:
+                continue
+            gate_a, gate_b = GATE_OFFSETS[offset]
+            gate_a += cell
+            gate_b += cell
+            if (gate_a in cells and gate_a != removed) != (gate_b in cells and gate_b != removed):
+                slides.append(target)
+        return tuple(slides)
+
+    def _find_articulation_points(self):
+        # iterative Tarjan over the occupied cells
+        cells = self._cells
+        points = set()
+        if not cells:
+            return points
+
+        root = next(iter(cells))
+        discovery = {root: 0}
+        low = {root: 0}
+        root_children = 0
+        stack = [(root, None, iter(NEIGHBOR_OFFSETS))]
+        while stack:
+            cell, parent, offsets = stack[-1]
+            for offset in offsets:
+                neighbor = cell + offset
+                if neighbor not in cells:
+                    continue
+                if neighbor not in discovery:
+                    discovery[neighbor] = low[neighbor] = len(discovery)
+                    stack.append((neighbor, cell, iter(NEIGHBOR_OFFSETS)))
+                    break
+                if neighbor != parent and discovery[neighbor] < low[cell]:
+                    low[cell] = discovery[neighbor]
+            else:
+                stack.pop()
+                if parent is None:
+                    continue
+                if low[cell] < low[parent]:
+                    low[parent] = low[cell]
+                if parent == root:
+                    root_children += 1
+                elif low[cell] >= discovery[parent]:
+                    points.add(parent)
+
+        if root_children > 1:
+            points.add(root)
+        return points
+
+    def is_hive_connected(self, old_cell, new_cell):
+        """
+        Cell based version of checkIfvalid, flood fills the hive without the
+        object at old_cell starting from new_cell.
+        Args:
+            old_cell (int): Cell of the object before the move.
+            new_cell (int): Cell of the object after the move, None to only
+            check if the object can leave its initial position.
+        Returns:
+            bool: True if the hive is still connected, False otherwise.
+        """
+        cells = self._cells
+        remaining = len(cells) - (old_cell in cells)
+
+        # Check if the object can leave its initial position
+        if new_cell is None:
+            for offset in NEIGHBOR_OFFSETS:
+                if old_cell + offset in cells:
+                    # search hive starting from first sibling
+                    new_cell = old_cell + offset
+                    break
+            else:
+                return remaining == 0
+
+        visited = {new_cell, old_cell}
+        stack = [new_cell]
+        found = 1 if new_cell in cells else 0
+        while stack:
+            cell = stack.pop()
+            for offset in NEIGHBOR_OFFSETS:
+                neighbor = cell + offset
+                if neighbor not in visited and neighbor in cells:
+                    visited.add(neighbor)
+                    found += 1
+                    stack.append(neighbor)
+
+        return found == remaining
+
     def canLeavePos(self, loc: Location):
         pass
         
@@ -344,19 +827,12 @@ class Board:
         Returns:
             bool: True if the object is surrounded by six, false otherwise.
         """
-        curr_x = loc.get_x()
-        curr_y = loc.get_y()
-        counter = 0
-        d = [(2,0),(-2,0),(1,1),(-1,1),(1,-1),(-1,-1)]
-        for (dx,dy) in d:
-            current_search_loc = Location(curr_x + dx, curr_y + dy)
-            if self._objects.get((current_search_loc),None) is not None:
-                counter = counter + 1        
-        if(counter == 6):
-            return True
-        else:
-            return False
-        
+        cells = self._cells
+        cell = cell_of(loc)
+        for offset in NEIGHBOR_OFFSETS:
+            if cell + offset not in cells:
+                return False
+        return True
 
     def getPossibleDeployLocations(self, team: int):
         """Gets the possible deploy location for an object based on their team.
@@ -367,83 +843,37 @@ class Board:
             list: List of the possible locations at which it can deploy on the hive.
         """
 
-        d = [(2,0),(-2,0),(1,1),(-1,1),(1,-1),(-1,-1)]
-
-        possible_locations = set()
-        objects = dict(self._objects)
-        for pos, obj in objects.items():
-            obj: GameObject
-            curr_x = obj.get_location().get_x()
-            curr_y = obj.get_location().get_y()
-            if(team == obj.get_team()):
-                for dx,dy in d:
-                    current_search_loc = Location(curr_x + dx, curr_y + dy)
-                    if objects.get((current_search_loc),None) is None:  # Free position neihgbouring a freindly object
-                        touching_enemy = False
-                        # Make sure that this position isn't touching an enemy object
-                        for dx2,dy2 in d:
-                            search_loc = Location(curr_x + dx + dx2, curr_y + dy + dy2)
-                            if objects.get((search_loc),None) is not None:  # An object found touching this position
-                                object:GameObject = objects.get(search_loc)
-                                if(object.get_team() is not team):  # This Object is an enemy Object
-                                    touching_enemy = True
-                        if(touching_enemy is False):
-                            possible_locations.add(current_search_loc)
-        
+        return {location_of(cell) for cell in self.deploy_cells(team)}
+
+    def deploy_cells(self, team: int):
+        """Cell based version of getPossibleDeployLocations, read from the
+        deploy cells kept up to date by every add, move and remove.
+
+        Args:
+            team (int): team of the object (Player 1 or 2).
+        Returns:
+            set: Set of the cells at which it can deploy on the hive.
+        """
+        possible_cells = set(self._deploy_cells[team])
+
         if self._turn_number == 0:
-            possible_locations.add(Location(0, 0))
+            possible_cells.add(pack(0, 0))
         elif self._turn_number == 1:
-            for dx, dy in d:
-                possible_locations.add(Location(dx, dy))
+            for offset in NEIGHBOR_OFFSETS:
+                possible_cells.add(pack(0, 0) + offset)
 
-        return possible_locations
-                           
-                        
-    
-    
-    def isNarrowPath(self, oldLoc: Location, newLoc: Location):
-        diff = newLoc - oldLoc
-        dx, dy = diff.get_x(), diff.get_y()
-        # moving from left to right
-        if((dx, dy) == (2, 0)):
-            # check top right and bottom right
-            top_right: Location = oldLoc + Location(1, 1)
-            bottom_right: Location = oldLoc + Location(1, -1)
-            return bool(self.get_object((top_right)) and self.get_object((bottom_right)))
-        
-        # moving from right to left
-        if((dx, dy) == (-2, 0)):
-            # check top left and bottom left
-            top_left: Location = oldLoc + Location(-1, 1)
-            bottom_left: Location = oldLoc + Location(-1, -1)
-            return bool(self.get_object(top_left) and self.get_object(bottom_left))
-        
-        # moving to top right
-        if((dx, dy) == (1, -1)):
-            # check for right and top left  
-            right: Location = oldLoc + Location(2, 0)
-            top_left: Location = oldLoc + Location(-1, -1)
-            return bool(self.get_object(right) and self.get_object(top_left))
-        
-        # moving bottom left
-        if((dx, dy) == (-1, 1)):
-            # check for left and bottom right
-            left: Location = oldLoc + Location(-2, 0)
-            bottom_right: Location = oldLoc + Location(1, 1)
-            return bool(self.get_object(left) and self.get_object(bottom_right))
-    
-        # moving top left
-        if((dx, dy) == (-1, -1)):
-            # check for left and top right
-            left: Location = oldLoc + Location(-2, 0)
-            top_right: Location = oldLoc + Location(1, -1)
-            return bool(self.get_object(left) and self.get_object(top_right))
-    
-        # moving bottom right
-        if((dx, dy) == (1, 1)):
-            # check for right and left bottom
-            right: Location = oldLoc + Location(2, 0)
-            bottom_left: Location = oldLoc + Location(-1, 1)
-            return bool(self.get_object(right) and self.get_object(bottom_left))
+        return possible_cells
 
+    def isNarrowPath(self, oldLoc: Location, newLoc: Location):
+        return self.is_narrow_path(cell_of(oldLoc), cell_of(newLoc))
 
+    def is_narrow_path(self, old_cell, new_cell):
+        """
+        Checks if sliding between two neighbouring cells is blocked by the
+        two cells on both sides of the path (the gate).
+        """
+        gate = GATE_OFFSETS.get(new_cell - old_cell)
+        if gate is None:
+            return None
+        cells = self._cells
+        return old_cell + gate[0] in cells and old_cell + gate[1] in cells
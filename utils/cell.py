@@ -0,0 +1,84 @@
+from .location import Location
+
+# Board coordinates are packed into a single non-negative int so the board can
+# index its occupancy without building (and hashing) Location objects.
+# x lives in the low 12 bits and y in the next 12, both biased by BIAS.
+BITS = 12
+STRIDE = 1 << BITS
+BIAS = STRIDE // 2
+MASK = STRIDE - 1
+
+# Same order as the d = [(2,0),(-2,0),(1,1),(-1,1),(1,-1),(-1,-1)] lists
+DIRECTIONS = [(2, 0), (-2, 0), (1, 1), (-1, 1), (1, -1), (-1, -1)]
+NEIGHBOR_OFFSETS = tuple(dx + dy * STRIDE for dx, dy in DIRECTIONS)
+
+# For every direction, the offsets of the two cells that form the "gate"
+# when sliding that way (the common neighbours of the two cells).
+GATE_OFFSETS = {
+    2: (1 + STRIDE, 1 - STRIDE),
+    -2: (-1 + STRIDE, -1 - STRIDE),
+    1 - STRIDE: (2, -1 - STRIDE),
+    -1 + STRIDE: (-2, 1 + STRIDE),
+    -1 - STRIDE: (-2, 1 - STRIDE),
+    1 + STRIDE: (2, -1 + STRIDE),
+}
+
+ORIGIN = BIAS + BIAS * STRIDE
+
+_locations = {}
+
+
+def pack(x, y):
+    """Packs x, y coordinates into a cell int."""
+    if not -BIAS <= x < BIAS or not -BIAS <= y < BIAS:
+        raise ValueError("Coordinates are out of the board range.")
+    return (x + BIAS) | ((y + BIAS) << BITS)
+
+
+def unpack(cell):
+    """Returns the (x, y) coordinates of a cell int."""
+    return (cell & MASK) - BIAS, (cell >> BITS) - BIAS
+
+
+def cell_of(location: Location):
+    return pack(location.get_x(), location.get_y())
+
+
+def location_of(cell):
+    """
+    Returns the Location of a cell. Locations are cached per cell so move
+    generation can hand them out without allocating new ones every time.
+    """
+    location = _locations.get(cell)
+    if location is None:
+        location = _locations[cell] = Location(*unpack(cell))
+    return location
+
+
+def neighbors(cell):
+    return [cell + offset for offset in NEIGHBOR_OFFSETS]
+
+
+def distance(cell_a, cell_b):
+    """Number of steps between two cells on the hex grid."""
+    ax, ay = unpack(cell_a)
+    bx, by = unpack(cell_b)
+    dx, dy = abs(ax - bx), abs(ay - by)
+    return max(dy, (dx + dy) // 2)
+
+
+# number of distance_bucket values
+DISTANCE_BUCKETS = 6
+
+
+def distance_bucket(cell, target):
+    """
+    Rough distance class of a cell to a target cell, 0 for its neighbours
+    (and 1 for the target itself) up to DISTANCE_BUCKETS - 1 for every cell
+    further away.
+    """
+    y_distance = abs((target >> BITS) - (cell >> BITS))
+    distance = abs((target & MASK) - (cell & MASK)) + y_distance
+    if distance == 0:
+        return 1
+    return min(max(distance // 2, y_distance) - 1, DISTANCE_BUCKETS - 1)
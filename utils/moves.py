@@ -0,0 +1,61 @@
+from array import array
+
+from .cell import BITS, location_of
+from .pieces import PIECE_TYPES
+
+# Moves are packed into a single int:
+#   bit 0       deploy flag
+#   bits 1-3    type_index of the moved or deployed piece
+#   bits 4-27   cell the piece moves from (0 for deploys)
+#   bits 28-51  cell the piece moves or is deployed to
+# Two 24-bit cells don't fit 32 bits, so move lists are 64-bit arrays.
+MOVE_TYPECODE = 'Q'
+CELL_MASK = (1 << (2 * BITS)) - 1
+FROM_SHIFT = 4
+TO_SHIFT = FROM_SHIFT + 2 * BITS
+
+# never produced by encode_deploy or encode_move
+NO_MOVE = 0
+
+
+def move_list():
+    return array(MOVE_TYPECODE)
+
+
+def encode_deploy(type_index, cell):
+    return 1 | (type_index << 1) | (cell << TO_SHIFT)
+
+
+def encode_move(type_index, from_cell, to_cell):
+    return (type_index << 1) | (from_cell << FROM_SHIFT) | (to_cell << TO_SHIFT)
+
+
+def is_deploy(move):
+    return move & 1
+
+
+def move_type(move):
+    return (move >> 1) & 7
+
+
+def move_from(move):
+    return (move >> FROM_SHIFT) & CELL_MASK
+
+
+def move_to(move):
+    return move >> TO_SHIFT
+
+
+def type_and_destination(move):
+    """The piece type and the cell it ends on, the same for a deploy and a move there."""
+    return ((move >> TO_SHIFT) << 3) | ((move >> 1) & 7)
+
+
+def decode_move(move):
+    """
+    Returns the move in the get_moves_and_deploys format:
+    (piece name, Location) for deploys or (Location, Location) for moves.
+    """
+    if move & 1:
+        return PIECE_TYPES[(move >> 1) & 7].__name__, location_of(move >> TO_SHIFT)
+    return location_of((move >> FROM_SHIFT) & CELL_MASK), location_of(move >> TO_SHIFT)
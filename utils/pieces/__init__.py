@@ -3,3 +3,6 @@ from .beetle import Beetle
 from .grass_hopper import Grasshopper
 from .queen import Queen
 from .spider import Spider
+
+# piece types in the order of their type_index
+PIECE_TYPES = (Queen, Ant, Grasshopper, Beetle, Spider)
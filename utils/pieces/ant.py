@@ -1,11 +1,14 @@
 import os
 import pygame
+from itertools import islice
 
 from utils.location import Location
+from utils.cell import distance_bucket
 
 from .game_object import GameObject
 
 class Ant(GameObject):
+    type_index = 1
     sprite = pygame.image.load(os.path.join("assets", "Ant.png"))
 
     def _check_surrounding(self, board):
@@ -45,53 +48,37 @@ class Ant(GameObject):
         else:
             return False
 
-    def get_next_possible_locations(self, board):
+    def get_next_possible_cells(self, board):
+        return self._walk(board)[1:]
+
+    def count_next_possible_cells(self, board, target=None, histogram=None):
+        walk = self._walk(board)
+        if histogram is not None:
+            for new_cell in islice(walk, 1, None):
+                histogram[distance_bucket(new_cell, target)] += 1
+        return max(len(walk) - 1, 0)
+
+    def _walk(self, board):
+        """The ant's cell followed by every cell it reaches, in BFS order."""
         if not board._queens_reference[self._team]:
             return []
-        
-        moves = []
-        visited = []
-        possible_moves: set[Location] = set()
-        loc: Location = self.get_location()
-        x, y = loc.get_x(), loc.get_y()
-        
+
+        cell = self._cell
+
         # check if object can leave its initial position
-        if(not board.checkIfvalid(loc, None)):
+        if(not board.can_leave(cell)):
             return []
-        
-        def step_forward(current_location: Location, prev_location: Location):
-            if(board.isNarrowPath(current_location, prev_location) or current_location in visited):
-                return False
-            
-            visited.append(current_location)
-            d = [(2,0),(-2,0),(1,1),(-1,1),(1,-1),(-1,-1)]
-            x = current_location.get_x()
-            y = current_location.get_y()
-            
-            # Check if current location has siblings (walking alongside the edge)
-            siblings = [board.get_object(Location(x+dx, y+dy)) for dx, dy in d if board.get_object(Location(x+dx,y+dy)) is not None and board.get_object(Location(x+dx,y+dy)) is not self]
-            
-            if(len(siblings) == 0):
-                return False
-            else:
-                possible_moves.add(current_location)
-            
-            for dx, dy in d:
-                new_loc: Location = Location(x+dx,y+dy)
-                if(new_loc is not prev_location):
-                    if(board.get_object(new_loc) is None):
-                        step_forward(new_loc, current_location)
-            
-        
-        # start traversing
-        d = [(2,0),(-2,0),(1,1),(-1,1),(1,-1),(-1,-1)]
-        for (dx,dy) in d:
-            newLoc: Location = Location(x+dx,y+dy)
-            if(board.get_object(newLoc) is None):
-                # Check if this step can be taken by the spider
-                result = step_forward(newLoc, self.get_location())
-            
-        return list(possible_moves)
+
+        # walk alongside the edge of the hive through the slide graph
+        visited = {cell}
+        queue = [cell]
+        for current_cell in queue:
+            for new_cell in board.slide_neighbors(current_cell, cell):
+                if new_cell not in visited:
+                    visited.add(new_cell)
+                    queue.append(new_cell)
+
+        return queue
         
         
         
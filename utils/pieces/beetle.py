@@ -1,11 +1,12 @@
 import os
 import pygame
 
-from utils.location import Location
+from utils.cell import NEIGHBOR_OFFSETS
 
 from .game_object import GameObject
 
 class Beetle(GameObject):
+    type_index = 3
     sprite = pygame.image.load(os.path.join("assets", "Beetle.png"))
 
     def __init__(self, location, team):
@@ -18,36 +19,39 @@ class Beetle(GameObject):
     def put_on_top_of(self, piece):
         self.on_top_off.append(piece)
 
-    def get_next_possible_locations(self, board):
+    def get_height(self):
+        if self.on_top_off:
+            return self.on_top_off[-1].get_height() + 1
+        return 0
+
+    def get_next_possible_cells(self, board):
         if not board._queens_reference[self._team]:
             return []
 
         # the beetle can move anywhere and on top of everyone
         possible_locations = []
-        loc: Location = self.get_location()
-        x, y = loc.get_x(), loc.get_y()
-        
+        cell = self._cell
+
         # check if beetle is on top off another object => can move freely anywhere
         if(len(self.on_top_off) != 0):
-            for dx, dy in [(2, 0), (-2, 0), (1, 1), (-1, 1), (-1, -1), (1, -1)]:
-                new_location = Location(x + dx, y + dy)
-                possible_locations.append(new_location)
-            
+            for offset in NEIGHBOR_OFFSETS:
+                possible_locations.append(cell + offset)
+
             return possible_locations
-            
+
         # check if object can leave its initial position
-        if(not board.checkIfvalid(loc, None)):
+        if(not board.can_leave(cell)):
             return []
 
-        for dx, dy in [(2, 0), (-2, 0), (1, 1), (-1, 1), (-1, -1), (1, -1)]:
-            new_location = Location(x + dx, y + dy)
-            if (board.get_object(new_location) is None): # if the new location is empty, check for narrow path.
-                if(not board.isNarrowPath(self.get_location(), new_location)):
-                    if board.checkIfvalid(self._location, new_location):
-                        possible_locations.append(new_location)
-            else: 
-                if(board.checkIfvalid(self._location, new_location)):
-                    possible_locations.append(new_location)
+        for offset in NEIGHBOR_OFFSETS:
+            new_cell = cell + offset
+            if (board.get_object_at(new_cell) is None): # if the new location is empty, check for narrow path.
+                if(not board.is_narrow_path(cell, new_cell)):
+                    if board.keeps_hive_connected(cell, new_cell):
+                        possible_locations.append(new_cell)
+            else:
+                if(board.keeps_hive_connected(cell, new_cell)):
+                    possible_locations.append(new_cell)
 
 
         return possible_locations
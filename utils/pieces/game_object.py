@@ -1,12 +1,27 @@
 from utils.location import Location
+from utils.cell import cell_of, location_of, distance_bucket
+
+
+def tally(cells, target=None, histogram=None):
+    """
+    Number of cells, each one is also counted in
+    histogram[distance_bucket(cell, target)] when a histogram is given.
+    """
+    if histogram is not None:
+        for cell in cells:
+            histogram[distance_bucket(cell, target)] += 1
+    return len(cells)
+
 
 class GameObject:
     sprite = None
+    type_index = None
 
     def __init__(self, location: Location, team):
         if not isinstance(location, Location):
             raise ValueError("location must be an instance of the Location class.")
         self._location = location
+        self._cell = cell_of(location)
         self._team = team
 
 
@@ -17,6 +32,14 @@ class GameObject:
         if not isinstance(location, Location):
             raise ValueError("location must be an instance of the Location class.")
         self._location = location
+        self._cell = cell_of(location)
+
+    def get_cell(self):
+        return self._cell
+
+    def get_height(self):
+        """Number of objects below this one on its cell."""
+        return 0
 
     def get_team(self):
         return self._team
@@ -31,4 +54,17 @@ class GameObject:
         return f"{self.__class__.__name__} at {self.get_location()}, in team {self._team}"
 
     def get_next_possible_locations(self, board):
+        return [location_of(cell) for cell in self.get_next_possible_cells(board)]
+
+    def get_next_possible_cells(self, board):
         raise NotImplementedError
+
+    def count_next_possible_cells(self, board, target=None, histogram=None):
+        """
+        Number of cells get_next_possible_cells returns, pieces override it
+        to count them without building the list.
+        Args:
+            target (int): cell the histogram measures the distance to.
+            histogram (list): counts per distance_bucket, every cell adds one.
+        """
+        return tally(self.get_next_possible_cells(board), target, histogram)
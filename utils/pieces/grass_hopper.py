@@ -2,10 +2,12 @@ import os
 import pygame
 
 from utils.location import Location
+from utils.cell import NEIGHBOR_OFFSETS
 
 from .game_object import GameObject
 
 class Grasshopper(GameObject):
+    type_index = 2
     sprite = pygame.image.load(os.path.join("assets", "Grasshopper.png"))
 
     def __init__(self, location, team):
@@ -21,29 +23,21 @@ class Grasshopper(GameObject):
     # def __repr__(self):
     #     return f"Grasshopper at {self.get_location()}"
 
-    def get_next_possible_locations(self, board):
-            newLocations = []
+    def get_next_possible_cells(self, board):
             possible_moves = []
+            cell = self._cell
 
-            loc = self.get_location()
-            x = loc.get_x()
-            y = loc.get_y()
-            
             # check if object can leave its initial position
-            if(not board.checkIfvalid(loc, None)):
+            if(not board.can_leave(cell)):
                 return []
-            
-            d = [(2,0),(-2,0),(1,1),(-1,1),(1,-1),(-1,-1)]
-            for (dx,dy) in d:
-                newLoc: Location = Location(x+dx,y+dy)
-                if(board.get_object(newLoc) is not None):
-                    new_x, new_y = x, y
-                    while (board.get_object(Location(new_x, new_y)) is not None):
-                        new_x += dx
-                        new_y += dy
-                    newLoc = Location(new_x, new_y) 
+
+            for offset in NEIGHBOR_OFFSETS:
+                if(board.get_object_at(cell + offset) is not None):
+                    new_cell = cell
+                    while (board.get_object_at(new_cell) is not None):
+                        new_cell += offset
                     # check if game is not ruined (Check if the hive is still connected)
-                    if(board.checkIfvalid(loc, newLoc)):
-                        possible_moves.append(newLoc)
-                    
+                    if(board.keeps_hive_connected(cell, new_cell)):
+                        possible_moves.append(new_cell)
+
             return possible_moves
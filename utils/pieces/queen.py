@@ -3,9 +3,10 @@ import pygame
 
 from utils.location import Location
 
-from .game_object import GameObject
+from .game_object import GameObject, tally
 
 class Queen(GameObject):
+    type_index = 0
     sprite = pygame.image.load(os.path.join("assets", "Queen.png"))
 
     def __init__(self, location, team):
@@ -19,25 +20,25 @@ class Queen(GameObject):
     # def __repr__(self):
     #     return f"Queen at {self.get_location()}"
 
-    def get_next_possible_locations(self, board):
+    def get_next_possible_cells(self, board):
         if not board._queens_reference[self._team]:
             return []
 
         possible_moves = []
-        loc: Location = self.get_location()
-        x = loc.get_x()
-        y = loc.get_y()
+        cell = self._cell
 
         # check if object can leave its initial position
-        if(not board.checkIfvalid(loc, None)):
+        if(not board.can_leave(cell)):
             return []
 
-        d = [(2,0),(-2,0),(1,1),(-1,1),(1,-1),(-1,-1)]
-        for (dx,dy) in d:
-            newLoc: Location = Location(x+dx,y+dy)
-            if(board.get_object(newLoc) is None):
-                if(not board.isNarrowPath(loc, newLoc)): # Check if the path is not narrow
-                    if(board.checkIfvalid(loc,newLoc)): # check if game is not ruined (Check if the hive is still connected)
-                        possible_moves.append(newLoc)
+        for new_cell in board.slide_neighbors(cell, cell):
+            possible_moves.append(new_cell)
 
         return possible_moves
+
+    def count_next_possible_cells(self, board, target=None, histogram=None):
+        cell = self._cell
+        if not board._queens_reference[self._team] or not board.can_leave(cell):
+            return 0
+        # the cached slides, not a copy of them
+        return tally(board.slide_neighbors(cell, cell), target, histogram)
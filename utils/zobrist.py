@@ -0,0 +1,34 @@
+from .cell import BITS
+
+# Zobrist keys for hashing board positions. Instead of a pre-generated table
+# (the board has no fixed bounds) every feature is mapped to its key through
+# the splitmix64 finalizer, which is a bijection on 64-bit ints, and cached.
+MASK64 = (1 << 64) - 1
+MAX_HEIGHT = 5  # four beetles on top of one piece
+SEED = 0x9E3779B97F4A7C15
+
+_keys = {}
+
+
+def _mix(value):
+    value = (value + SEED) & MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+    return value ^ (value >> 31)
+
+
+def piece_key(type_index, team, cell, height):
+    """Key of a piece type of a team standing on a cell at a stack height."""
+    index = (((type_index * 2 + team) * MAX_HEIGHT + height) << (2 * BITS)) | cell
+    key = _keys.get(index)
+    if key is None:
+        key = _keys[index] = _mix(index)
+    return key
+
+
+def object_key(game_object):
+    return piece_key(game_object.type_index, game_object.get_team(), game_object.get_cell(), game_object.get_height())
+
+
+# XORed in when it's the second player's turn
+SIDE_KEY = _mix(MASK64)